@@ -1,13 +1,16 @@
 # app/app_initializer.py
-import ipaddress
+import asyncio
+import contextlib
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .config import settings
+from .config import HOT_SETTINGS, settings
 from .data_collector import script_cache
-from .database import get_db_session, init_db, shutdown_db
-from .dependencies import get_winrm_service
+from .database import get_db_session, init_db, shutdown_db, warmup_db
+from .logging_config import flush_logs, stop_logging
 from .services.encryption_service import get_encryption_service
+from .services.winrm_service import WinRMService
+from .utils.background import drain_background_tasks, reset_shutdown_event
 
 logger = logging.getLogger(__name__)
 
@@ -18,51 +21,53 @@ class AppInitializer:
     def __init__(self, app: FastAPI):
         self.app = app
         self.settings_manager = settings
+        self._log_flush_task: asyncio.Task | None = None
         # Синхронна ініціалізація IP-діапазонів
         self._initialize_ip_networks_sync()
 
     def _initialize_ip_networks_sync(self):
         """Синхронно ініціалізує дозволені IP-діапазони."""
         logger.info("Синхронна ініціалізація дозволених IP-діапазонів...")
-        self.app.state.allowed_ip_networks = []
-        allowed_ips_list = self.settings_manager.allowed_ips_list
-        logger.debug(f"ALLOWED_IPS_LIST: {allowed_ips_list}")
-        if not allowed_ips_list:
+        self.settings_manager.refresh_hot_settings()
+        allowed_ips = HOT_SETTINGS["allowed_ips"]
+        if not allowed_ips:
             logger.warning("ALLOWED_IPS не задано, дозволено всі IP-адреси")
-            return
-        for ip_range in allowed_ips_list:
-            try:
-                if "/" in ip_range:
-                    network = ipaddress.ip_network(ip_range, strict=False)
-                    self.app.state.allowed_ip_networks.append(network)
-                    logger.debug(f"Додано IP-мережу: {network}")
-                else:
-                    address = ipaddress.ip_address(ip_range)
-                    self.app.state.allowed_ip_networks.append(address)
-                    logger.debug(f"Додано IP-адресу: {address}")
-            except ValueError as e:
-                logger.error(f"Невірний формат IP-діапазону {ip_range}: {str(e)}")
-                continue
-        logger.info(f"Ініціалізовано {len(self.app.state.allowed_ip_networks)} IP-діапазонів: {self.app.state.allowed_ip_networks}")
+        logger.info("Ініціалізовано %d IP-діапазонів: %s", len(allowed_ips), allowed_ips)
+
+    async def _flush_logs_periodically(self, interval: float = 1.0):
+        """Раз на interval секунд скидає буфер файлу логів (запис - у окремому потоці)."""
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(flush_logs)
+
+    async def _initialize_database(self):
+        """Створює відсутні таблиці та прогріває пул з'єднань."""
+        await init_db()
+        await warmup_db()
 
     async def initialize(self):
         logger.info("Асинхронна ініціалізація додатка...")
+        reset_shutdown_event()
         try:
-            # Ініціалізація налаштувань
-            async with get_db_session() as db:
-                await self.settings_manager.initialize_settings(db)
-
             # Ініціалізація encryption_service
             self.app.state.encryption_service = get_encryption_service()
 
-            # Ініціалізація бази даних
-            await init_db()
+            # Ініціалізація бази даних; скрипти тим часом читаються з диска в пулі потоків
+            await asyncio.gather(self._initialize_database(), script_cache.preload_scripts())
+
+            # Динамічні налаштування читаються з таблиці app_settings, тож лише після init_db
+            async with get_db_session() as db:
+                await self.settings_manager.load_dynamic_settings(db)
+
+            # Ініціалізація WinRMService: один екземпляр на весь час роботи додатка,
+            # сесії БД він відкриває сам лише на час запиту облікових даних
+            self.app.state.winrm_service = WinRMService(self.app.state.encryption_service)
+            await self.app.state.winrm_service.initialize()
+            logger.info("WinRMService ініціалізовано")
 
-            # Ініціалізація WinRMService
-            self.app.state.winrm_service = await get_winrm_service(self.app)
+            # Фонове скидання логів запускаємо лише після успішної ініціалізації
+            self._log_flush_task = asyncio.create_task(self._flush_logs_periodically())
 
-            # Попереднє завантаження скриптів
-            await script_cache.preload_scripts()
             # Більше тут нічого не потрібно, setup_logging вже був викликаний
         except Exception as e:
             logger.error(f"Помилка асинхронної ініціалізації додатка: {str(e)}", exc_info=True)
@@ -71,10 +76,18 @@ class AppInitializer:
     async def shutdown(self):
         """Завершує роботу додатка."""
         logger.info("Завершення роботи...")
+        # Фонові сканування ще використовують пул БД і WinRM - дочікуємось їх першими
+        await drain_background_tasks()
+        if self._log_flush_task is not None:
+            self._log_flush_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._log_flush_task
         await shutdown_db()
+        # Останнім: дописуємо чергу логів, включно з повідомленнями про закриття БД
+        stop_logging()
 
     @asynccontextmanager
-    async def lifespan(self):
+    async def lifespan(self, app: FastAPI):
         """Контекстний менеджер для життєвого циклу додатка."""
         await self.initialize()
         yield
@@ -1,4 +0,0 @@
-from sqlalchemy.orm import DeclarativeBase
-
-# Експортуємо SQLAlchemy Base клас
-Base = DeclarativeBase
\ No newline at end of file
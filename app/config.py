@@ -3,12 +3,13 @@ import logging
 from pathlib import Path
 from typing import List, Optional
 from fastapi import HTTPException
-from pydantic import ConfigDict
+from pydantic import ConfigDict, Field
 from pydantic_settings import BaseSettings
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from .logging_config import setup_logging
 from app.models import AppSetting
+from .utils.security import IPAllowList, build_ip_allowlist
 from .utils.validators import (
     AllowedIPsStr,
     CORSOriginsStr,
@@ -20,6 +21,10 @@ from .utils.validators import (
 
 logger = logging.getLogger(__name__)
 
+# Знімок значень, які читаються на кожному запиті (обробник винятків, перевірка IP).
+# Оновлюється через AppSettings.refresh_hot_settings після завантаження/збереження налаштувань.
+HOT_SETTINGS: dict = {"debug": False, "allowed_ips": IPAllowList(), "cors_origins": frozenset(), "version": 0}
+
 class AppSettings(BaseSettings):
     """
     Єдиний клас для керування всіма налаштуваннями додатку.
@@ -33,9 +38,27 @@ class AppSettings(BaseSettings):
     log_level: NonEmptyStr = "DEBUG"  
     timezone: NonEmptyStr = "UTC"
 
+    # --- Пул з'єднань БД (з .env) ---
+    # Кожен процес uvicorn має власний пул: при --workers N сервер БД
+    # бачить до N * (db_pool_size + db_max_overflow) з'єднань.
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 10
+    db_pool_recycle: int = 3600
+    # LIFO: видається останнє повернуте (тепле) з'єднання, а зайві при спаді навантаження
+    # простоюють і закриваються за pool_recycle
+    db_pool_use_lifo: bool = True
+    # Кеш скомпільованого SQL на engine (кількість записів); запити з різними фільтрами /computers
+    # дають багато варіантів, тож стандартних 500 замало
+    db_query_cache_size: int = 1200
+    # Створення відсутніх таблиць при старті; вимкніть, якщо схемою керує Alembic
+    db_auto_create: bool = True
+    # OpenAPI-схема та /docs; у продакшені можна вимкнути, щоб не будувати схему
+    openapi_enabled: bool = True
+
     # --- Поля налаштувань, які можуть бути динамічними (з БД) ---
     api_url: Optional[NonEmptyStr] = None
-    scan_max_workers: int = 10
+    scan_max_workers: int = Field(10, ge=1)
     polling_days_threshold: int = 30
     winrm_operation_timeout: int = 120
     winrm_read_timeout: int = 180
@@ -64,6 +87,25 @@ class AppSettings(BaseSettings):
         """Перетворює allowed_ips у список IP-адрес або діапазонів."""
         return [ip.strip() for ip in self.allowed_ips.split(",") if ip.strip()]
 
+    def engine_kwargs(self) -> dict:
+        """Параметри пулу з'єднань для create_async_engine."""
+        return {
+            "pool_size": self.db_pool_size,
+            "max_overflow": self.db_max_overflow,
+            "pool_timeout": self.db_pool_timeout,
+            "pool_recycle": self.db_pool_recycle,
+            "pool_use_lifo": self.db_pool_use_lifo,
+            "query_cache_size": self.db_query_cache_size,
+        }
+
+    def refresh_hot_settings(self):
+        """Оновлює HOT_SETTINGS з поточних значень налаштувань."""
+        HOT_SETTINGS["debug"] = self.log_level.upper() == "DEBUG"
+        HOT_SETTINGS["allowed_ips"] = build_ip_allowlist(self.allowed_ips_list)
+        HOT_SETTINGS["cors_origins"] = frozenset(self.cors_allow_origins_list)
+        # Версія змінюється при кожному оновленні - за нею інвалідовуються кеші похідних даних
+        HOT_SETTINGS["version"] += 1
+
     async def load_dynamic_settings(self, db: AsyncSession):
         """
         Завантажує налаштування з бази даних і оновлює поточні значення.
@@ -71,10 +113,7 @@ class AppSettings(BaseSettings):
         """
         logger.info("Завантаження динамічних налаштувань з бази даних...")
 
-        # 1. Ініціалізація ключа шифрування (критично важливий крок)
-        await self._initialize_encryption_key(db)
-
-        # 2. Завантаження всіх налаштувань з БД
+        # Ключ шифрування береться лише з .env (ENCRYPTION_KEY) і в БД не зберігається
         try:
             result = await db.execute(select(AppSetting))
             db_settings = {setting.key: setting.value for setting in result.scalars().all()}
@@ -91,6 +130,7 @@ class AppSettings(BaseSettings):
                     except (ValueError, TypeError) as e:
                         logger.warning(f"Не вдалося конвертувати налаштування '{key}' зі значенням '{value}': {e}")
 
+            self.refresh_hot_settings()
             logger.info("Динамічні налаштування успішно завантажені та застосовані.")
 
         except Exception as e:
@@ -99,22 +139,26 @@ class AppSettings(BaseSettings):
 
     async def save_settings(self, db: AsyncSession, updates: dict):
         """Зберігає оновлені налаштування в базу даних."""
-        logger.info(f"Збереження налаштувань в БД: {updates}")
+        logger.info("Збереження налаштувань в БД: %s", updates)
+        values = {key: value for key, value in updates.items() if value is not None and hasattr(self, key)}
         try:
-            for key, value in updates.items():
-                if value is not None and hasattr(self, key):
-                    result = await db.execute(select(AppSetting).filter_by(key=key))
-                    existing_setting = result.scalar_one_or_none()
+            # Один SELECT на всі ключі замість запиту на кожен; нові рядки вставляються
+            # одним пакетним INSERT при flush
+            result = await db.execute(select(AppSetting).where(AppSetting.key.in_(list(values))))
+            existing = {setting.key: setting for setting in result.scalars()}
 
-                    if existing_setting:
-                        existing_setting.value = str(value)
-                    else:
-                        db.add(AppSetting(key=key, value=str(value)))
+            for key, value in values.items():
+                existing_setting = existing.get(key)
+                if existing_setting:
+                    existing_setting.value = str(value)
+                else:
+                    db.add(AppSetting(key=key, value=str(value)))
 
-                    # Оновлюємо значення в поточному об'єкті
-                    setattr(self, key, value)
+                # Оновлюємо значення в поточному об'єкті
+                setattr(self, key, value)
 
             await db.commit()
+            self.refresh_hot_settings()
             logger.info("Налаштування успішно збережені.")
         except Exception as e:
             await db.rollback()
@@ -123,6 +167,7 @@ class AppSettings(BaseSettings):
 
 # Створюємо єдиний екземпляр налаштувань для всього додатку
 settings = AppSettings()
+settings.refresh_hot_settings()
 
 # Налаштовуємо логування з початковим рівнем
 setup_logging(log_level=settings.log_level)
\ No newline at end of file
@@ -55,21 +55,30 @@ class ScriptCache:
             logger.warning(f"Папка {scripts_dir} не існує")
             return
 
+        script_names = [f for f in os.listdir(scripts_dir) if f.endswith(".ps1")]
+        # Файли читаються паралельно в пулі потоків, не блокуючи event loop
+        results = await asyncio.gather(
+            *(asyncio.to_thread(self._load_script, script_name) for script_name in script_names),
+            return_exceptions=True,
+        )
         script_count = 0
-        for script_name in [f for f in os.listdir(scripts_dir) if f.endswith(".ps1")]:
-            try:
-                self.get(script_name)
-                script_count += 1
-                logger.debug(
-                    f"Скрипт {script_name} завантажено в кеш",
-                    extra={"script_name": script_name},
-                )
-            except Exception as e:
+        for script_name, result in zip(script_names, results):
+            if isinstance(result, Exception):
                 logger.error(
-                    f"Помилка завантаження {script_name}: {str(e)}",
+                    "Помилка завантаження %s: %s",
+                    script_name,
+                    result,
                     extra={"script_name": script_name},
                 )
-        logger.info(f"Завантажено {script_count} скриптів у кеш")
+                continue
+            self._cache[script_name] = result
+            script_count += 1
+            logger.debug(
+                "Скрипт %s завантажено в кеш",
+                script_name,
+                extra={"script_name": script_name},
+            )
+        logger.info("Завантажено %d скриптів у кеш", script_count)
 
     def clear(self):
         """Очищає кеш скриптів."""
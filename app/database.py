@@ -1,9 +1,13 @@
 import logging
 from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
-from app.base import Base
+import asyncio
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from .models import AppSetting, Base, Computer, OperatingSystem, ScanTask
 from .config import settings
+from .logging_config import traceback_enabled
 
 logger = logging.getLogger(__name__)
 
@@ -15,60 +19,125 @@ if not SQLALCHEMY_DATABASE_URL:
 
 
 # Створюємо асинхронний engine
+# Розмір пулу, таймаут і pool_recycle задаються через settings (DB_POOL_*).
+# pool_recycle за замовчуванням - година, менше за wait_timeout MySQL,
+# тож pre-ping зазвичай виконується на ще "теплому" сокеті.
 engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL,
-    pool_size=20,
-    max_overflow=10,
+    poolclass=AsyncAdaptedQueuePool,
+    # Перевірка з'єднання перед видачею з пулу: мертві сокети (NAT/firewall)
+    # відкидаються до першого запиту, а не падають з OperationalError
     pool_pre_ping=True,
-    pool_timeout=10,
-    pool_recycle=3600,
+    **settings.engine_kwargs(),
     # echo=True  # Для дебагу SQL запитів
 )
 
 # Створюємо фабрику сесій для асинхронних сесій
-async_session_factory = sessionmaker(
+async_session_factory = async_sessionmaker(
     engine,
-    class_=AsyncSession,
     autoflush=False,
-    autocommit=False,
     expire_on_commit=False,
 )
 
 
+@event.listens_for(Session, "do_orm_execute")
+def _mark_dml_execute(orm_execute_state):
+    """Позначає сесію, в якій через session.execute виконувалось щось, крім SELECT.
+
+    Перевіряємо саме "не SELECT": text("UPDATE ...") та інші текстові запити не мають
+    is_update, тож вважаються записом, щоб get_db не відкотив їх мовчки.
+    Запити напряму через session.connection() сюди не потрапляють - такий код має сам викликати commit.
+    """
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["has_writes"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flush(session, flush_context):
+    session.info["has_writes"] = True
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _reset_writes(session):
+    session.info.pop("has_writes", None)
+
+
+def _has_pending_writes(session: AsyncSession) -> bool:
+    """Чи є в поточній транзакції сесії зміни, які треба зафіксувати."""
+    if not session.in_transaction():
+        return False
+    return bool(session.info.get("has_writes") or session.new or session.dirty or session.deleted)
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_factory() as session:
         try:
             yield session
-            await session.commit()
+            # Для запитів лише на читання COMMIT не надсилаємо: транзакцію закриє
+            # rollback при поверненні з'єднання в пул
+            if _has_pending_writes(session):
+                await session.commit()
         except Exception as e:
-            logger.error(f"Помилка в сесії {id(session)}, відкат: {str(e)}", exc_info=True)
+            logger.error("Помилка в сесії %s, відкат: %s", id(session), e, exc_info=traceback_enabled())
             await session.rollback()
             raise
-        finally:
-            await session.close()
 
 
 def get_db_session() -> AsyncSession:
     return async_session_factory()
 
 
+def _create_missing_tables(sync_conn) -> int:
+    """Створює лише відсутні таблиці: один запит до каталогу замість has_table на кожну модель."""
+    existing = set(inspect(sync_conn).get_table_names())
+    missing = [table for table in Base.metadata.sorted_tables if table.name not in existing]
+    if missing:
+        Base.metadata.create_all(sync_conn, tables=missing, checkfirst=False)
+    return len(missing)
+
+
 async def init_db():
+    if not settings.db_auto_create:
+        logger.info("Автоматичне створення таблиць вимкнено (DB_AUTO_CREATE=false)")
+        return
     try:
         async with engine.begin() as conn:
             logger.debug("Створення таблиць бази даних")
 
-            await conn.run_sync(Base.metadata.create_all)
-        logger.info("База даних успішно ініціалізована")
+            created = await conn.run_sync(_create_missing_tables)
+        logger.info("База даних успішно ініціалізована, створено таблиць: %d", created)
     except Exception as e:
-        logger.error(f"Помилка ініціалізації бази даних: {str(e)}", exc_info=True)
+        logger.error("Помилка ініціалізації бази даних: %s", e, exc_info=True)
         raise
 
 
+async def warmup_db():
+    """Заповнює пул живими з'єднаннями та прогріває кеш компіляції основних запитів.
+
+    Без цього перші pool_size запитів після старту платять за TCP/auth-handshake і компіляцію SQL.
+    """
+
+    async def _ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    try:
+        # Одночасні з'єднання, щоб пул відкрив pool_size окремих сокетів
+        await asyncio.gather(*(_ping() for _ in range(settings.db_pool_size)))
+        async with engine.connect() as conn:
+            for model in (Computer, OperatingSystem, ScanTask, AppSetting):
+                await conn.execute(select(model).limit(1))
+        logger.info("Пул з'єднань прогріто: %d з'єднань", settings.db_pool_size)
+    except Exception as e:
+        logger.warning("Не вдалося прогріти пул з'єднань: %s", e)
+
+
 async def shutdown_db():
     try:
         logger.debug("Закриття пулу з'єднань бази даних")
         await engine.dispose()
         logger.info("З'єднання з базою даних закрито")
     except Exception as e:
-        logger.error(f"Помилка при закритті пулу з'єднань: {str(e)}", exc_info=True)
+        logger.error("Помилка при закритті пулу з'єднань: %s", e, exc_info=True)
         raise
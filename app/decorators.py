@@ -1,73 +1,107 @@
-import asyncio
 import functools
+import inspect
 import logging
 import time
-from typing import Any, Callable
+from typing import Any, Callable, Optional
 
 logger = logging.getLogger(__name__)
 
+# Копіюємо лише атрибути, потрібні для логів і налагодження; __dict__ та __annotations__ не переносимо
+_WRAPPER_ASSIGNMENTS = ("__module__", "__name__", "__qualname__", "__doc__")
 
-def log_function_call(func: Callable) -> Callable:
+
+def log_function_call(func: Optional[Callable] = None, *, enabled: bool = True) -> Callable:
     """
     Декоратор для логування викликів функцій, їхніх аргументів,
     результатів та часу виконання. Підтримує синхронні та асинхронні функції.
+    Аргументи форматуються та час вимірюється лише при увімкненому рівні DEBUG.
+
+    Використання: ``@log_function_call`` або ``@log_function_call(enabled=...)``;
+    при ``enabled=False`` функція повертається без обгортки.
     """
+    if func is None:
+        return functools.partial(log_function_call, enabled=enabled)
+    if not enabled:
+        return func
+
+    @functools.wraps(func, assigned=_WRAPPER_ASSIGNMENTS, updated=())
+    async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+        func_name = func.__name__
+        if not logger.isEnabledFor(logging.DEBUG):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                logger.error("Помилка у функції %s: %s", func_name, e, exc_info=True, extra={"func_name": func_name})
+                raise
 
-    def _format_args(args: Any, kwargs: Any) -> dict:
-        """Форматує аргументи для логування, обмежуючи їх розмір."""
+        start_time = time.perf_counter()
         try:
             # Обмежуємо розмір аргументів для логування
-            args_str = str(args)[:1000]
-            kwargs_str = str(kwargs)[:1000]
-            return {"func_args": args_str, "func_kwargs": kwargs_str}
+            extra = {"func_name": func_name, "func_args": str(args)[:1000], "func_kwargs": str(kwargs)[:1000]}
         except Exception as e:
-            logger.warning(f"Помилка форматування аргументів: {e}")
-            return {"func_args": "<unformattable>", "func_kwargs": "<unformattable>"}
-
-    @functools.wraps(func)
-    async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
-        start_time = time.perf_counter()
-        func_name = func.__name__
-        extra = {"func_name": func_name, **_format_args(args, kwargs)}
-        logger.debug(f"Виклик асинхронної функції: {func_name}", extra=extra)
+            logger.warning("Помилка форматування аргументів: %s", e)
+            extra = {"func_name": func_name, "func_args": "<unformattable>", "func_kwargs": "<unformattable>"}
+        logger.debug("Виклик асинхронної функції: %s", func_name, extra=extra)
         try:
             result = await func(*args, **kwargs)
             end_time = time.perf_counter()
             logger.debug(
-                f"Функція {func_name} завершилася успішно за {end_time - start_time:.4f}с",
+                "Функція %s завершилася успішно за %.4fс",
+                func_name,
+                end_time - start_time,
                 extra={**extra, "execution_time": end_time - start_time},
             )
             return result
         except Exception as e:
             end_time = time.perf_counter()
             logger.error(
-                f"Помилка у функції {func_name} після {end_time - start_time:.4f}с: {e}",
+                "Помилка у функції %s після %.4fс: %s",
+                func_name,
+                end_time - start_time,
+                e,
                 exc_info=True,
                 extra={**extra, "execution_time": end_time - start_time},
             )
             raise
 
-    @functools.wraps(func)
+    @functools.wraps(func, assigned=_WRAPPER_ASSIGNMENTS, updated=())
     def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
-        start_time = time.perf_counter()
         func_name = func.__name__
-        extra = {"func_name": func_name, **_format_args(args, kwargs)}
-        logger.debug(f"Виклик синхронної функції: {func_name}", extra=extra)
+        if not logger.isEnabledFor(logging.DEBUG):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                logger.error("Помилка у функції %s: %s", func_name, e, exc_info=True, extra={"func_name": func_name})
+                raise
+
+        start_time = time.perf_counter()
+        try:
+            # Обмежуємо розмір аргументів для логування
+            extra = {"func_name": func_name, "func_args": str(args)[:1000], "func_kwargs": str(kwargs)[:1000]}
+        except Exception as e:
+            logger.warning("Помилка форматування аргументів: %s", e)
+            extra = {"func_name": func_name, "func_args": "<unformattable>", "func_kwargs": "<unformattable>"}
+        logger.debug("Виклик синхронної функції: %s", func_name, extra=extra)
         try:
             result = func(*args, **kwargs)
             end_time = time.perf_counter()
             logger.debug(
-                f"Функція {func_name} завершилася успішно за {end_time - start_time:.4f}с",
+                "Функція %s завершилася успішно за %.4fс",
+                func_name,
+                end_time - start_time,
                 extra={**extra, "execution_time": end_time - start_time},
             )
             return result
         except Exception as e:
             end_time = time.perf_counter()
             logger.error(
-                f"Помилка у функції {func_name} після {end_time - start_time:.4f}с: {e}",
+                "Помилка у функції %s після %.4fс: %s",
+                func_name,
+                end_time - start_time,
+                e,
                 exc_info=True,
                 extra={**extra, "execution_time": end_time - start_time},
             )
             raise
 
-    return async_wrapper if asyncio.iscoroutinefunction(func) else sync_wrapper
+    return async_wrapper if inspect.iscoroutinefunction(func) else sync_wrapper
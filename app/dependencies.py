@@ -1,22 +1,48 @@
 # app/dependencies.py
 import logging
+from functools import cached_property
 
-from fastapi import Depends
+from fastapi import Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .database import get_db_session
+from .database import get_db
+from .repositories.computer_repository import ComputerRepository
+from .services.ad_service import ADService
+from .services.computer_service import ComputerService
 from .services.encryption_service import get_encryption_service
 from .services.winrm_service import WinRMService
 
 logger = logging.getLogger(__name__)
 
 
-async def get_winrm_service(
-    db: AsyncSession = Depends(get_db_session),
-    encryption_service=Depends(get_encryption_service),
-):
-    """Отримує ініціалізований екземпляр WinRMService."""
-    winrm_service = WinRMService(encryption_service, db)
-    await winrm_service.initialize()
-    logger.info("WinRMService ініціалізовано")
-    return winrm_service
+def get_winrm_service(request: Request) -> WinRMService:
+    """Повертає екземпляр WinRMService, створений під час старту додатка."""
+    return request.app.state.winrm_service
+
+
+class ServiceContainer:
+    """Сервіси одного запиту: створюються лише при першому зверненні й ділять одну сесію БД."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @cached_property
+    def computer_service(self) -> ComputerService:
+        return ComputerService(self.db)
+
+    @cached_property
+    def computer_repo(self) -> ComputerRepository:
+        return self.computer_service.computer_repo
+
+    @cached_property
+    def ad_service(self) -> ADService:
+        return ADService(self.computer_repo, get_encryption_service())
+
+
+def get_services(request: Request, db: AsyncSession = Depends(get_db)) -> ServiceContainer:
+    """Повертає контейнер сервісів запиту, кешований у request.state."""
+    container = getattr(request.state, "services", None)
+    if container is None:
+        container = ServiceContainer(db)
+        request.state.services = container
+    return container
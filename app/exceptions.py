@@ -1,66 +1,91 @@
 import logging
-from fastapi import HTTPException, Request, status
-from fastapi.responses import JSONResponse
+from asyncio import TimeoutError
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple, Type, Union
+
+from fastapi import Request, status
+from fastapi.responses import Response
+from pydantic import ValidationError
 from sqlalchemy.exc import IntegrityError, OperationalError, SQLAlchemyError
 from winrm.exceptions import WinRMError, WinRMTransportError
-from .config import settings
+
+from .config import HOT_SETTINGS
+from .logging_config import correlation_id_var, traceback_enabled
 from .schemas import ErrorResponse
-from pydantic import ValidationError
-from asyncio import TimeoutError
 
 logger = logging.getLogger(__name__)
-settings_manager = settings
+
+# Відповідність типу винятку -> (HTTP-статус, повідомлення або функція, що його будує).
+# Пошук іде по type(exc).__mro__, тож спрацьовує найконкретніший зареєстрований клас.
+_EXCEPTION_RESPONSES: Dict[Type[BaseException], Tuple[int, Union[str, Callable[[Exception], str]]]] = {
+    IntegrityError: (status.HTTP_409_CONFLICT, "Запис із такими даними вже існує."),
+    OperationalError: (status.HTTP_503_SERVICE_UNAVAILABLE, "Помилка з'єднання з базою даних. Спробуйте пізніше."),
+    SQLAlchemyError: (status.HTTP_500_INTERNAL_SERVER_ERROR, "Сталася помилка бази даних."),
+    WinRMTransportError: (status.HTTP_503_SERVICE_UNAVAILABLE, "Помилка підключення до WinRM-хоста."),
+    WinRMError: (status.HTTP_503_SERVICE_UNAVAILABLE, "Помилка підключення до WinRM-хоста."),
+    ValidationError: (status.HTTP_422_UNPROCESSABLE_ENTITY, lambda exc: f"Помилка валідації даних: {exc.errors()}"),
+    TimeoutError: (status.HTTP_504_GATEWAY_TIMEOUT, "Таймаут виконання операції."),
+    ValueError: (status.HTTP_400_BAD_REQUEST, str),
+}
+_DEFAULT_RESPONSE = (status.HTTP_500_INTERNAL_SERVER_ERROR, "Внутрішня помилка сервера.")
+
+# Обробник для Exception викликається ServerErrorMiddleware, який стоїть зовні
+# CORSMiddleware, тому CORS-заголовки для помилок доводиться додавати тут.
+# Заголовки ті самі, що додав би CORSMiddleware для простого запиту з дозволеного origin.
+@lru_cache(maxsize=32)
+def _cors_headers_for(origin: str) -> Dict[str, str]:
+    return {
+        "Access-Control-Allow-Origin": origin,
+        "Access-Control-Allow-Credentials": "true",
+        "Vary": "Origin",
+    }
+
+
+def _resolve_exception(exc: Exception) -> Tuple[int, str]:
+    """Визначає HTTP-статус і повідомлення для винятку."""
+    for cls in type(exc).__mro__:
+        mapping = _EXCEPTION_RESPONSES.get(cls)
+        if mapping is not None:
+            status_code, message = mapping
+            return status_code, message(exc) if callable(message) else message
+    return _DEFAULT_RESPONSE
+
+
+def _cors_headers(request: Request) -> Optional[Dict[str, str]]:
+    """CORS-заголовки для відповіді з помилкою; лише для origin з CORS_ALLOW_ORIGINS.
+
+    "*" у CORS_ALLOW_ORIGINS, як і в CORSMiddleware, дозволяє будь-який origin. Повертаємо
+    конкретний origin, а не "*": з Allow-Credentials браузер "*" не приймає.
+    """
+    origin = request.headers.get("Origin")
+    if not origin:
+        return None
+    cors_origins = HOT_SETTINGS["cors_origins"]
+    if origin not in cors_origins and "*" not in cors_origins:
+        return None
+    return _cors_headers_for(origin)
 
 
 async def global_exception_handler(request: Request, exc: Exception):
     """Глобальний обробник винятків для додатка."""
     correlation_id = getattr(request.state, "correlation_id", "unknown")
-    request_logger = request.state.logger if hasattr(request.state, "logger") else logger
-    request_logger.error(f"Необроблений виняток: {exc}", exc_info=True)
-
-    match exc:
-            case HTTPException(status_code=status_code, detail=detail):
-                error_message = detail
-            case IntegrityError():
-                status_code = status.HTTP_409_CONFLICT
-                error_message = "Запис із такими даними вже існує."
-            case OperationalError():
-                status_code = status.HTTP_503_SERVICE_UNAVAILABLE
-                error_message = "Помилка з'єднання з базою даних. Спробуйте пізніше."
-            case SQLAlchemyError():
-                status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
-                error_message = "Сталася помилка бази даних."
-            case WinRMTransportError() | WinRMError():
-                status_code = status.HTTP_503_SERVICE_UNAVAILABLE
-                error_message = "Помилка підключення до WinRM-хоста."
-            case ValidationError():
-                status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
-                error_message = f"Помилка валідації даних: {exc.errors()}"
-            case TimeoutError():
-                status_code = status.HTTP_504_GATEWAY_TIMEOUT
-                error_message = "Таймаут виконання операції."
-            case ValueError():
-                status_code = status.HTTP_400_BAD_REQUEST
-                error_message = str(exc)
-            case _:
-                status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
-                error_message = "Внутрішня помилка сервера."
+    # Обробник працює в ServerErrorMiddleware, зовні CorrelationIdMiddleware, що вже скинув contextvar
+    correlation_id_var.set(correlation_id)
+
+    logger.error("Необроблений виняток: %s", exc, exc_info=traceback_enabled())
+
+    status_code, error_message = _resolve_exception(exc)
 
     response = ErrorResponse(
         error=error_message,
-        detail=(str(exc) if settings_manager.log_level == "DEBUG" else "Деталі помилки приховані"),
+        detail=(str(exc) if HOT_SETTINGS["debug"] else "Деталі помилки приховані"),
         correlation_id=correlation_id,
     )
 
-    headers = {
-        "Access-Control-Allow-Origin": request.headers.get("Origin", "*"),
-        "Access-Control-Allow-Credentials": "true",
-        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-        "Access-Control-Allow-Headers": "*",
-    }
-
-    return JSONResponse(
+    # model_dump_json серіалізує одразу в байти через pydantic-core, без проміжного dict і json.dumps
+    return Response(
+        content=response.model_dump_json(exclude_none=True),
         status_code=status_code,
-        content=response.model_dump(exclude_none=True),
-        headers=headers,
+        media_type="application/json",
+        headers=_cors_headers(request),
     )
@@ -1,8 +1,67 @@
 # app/logging_config.py
+import atexit
 import logging
+import queue
 import sys
-from logging.handlers import TimedRotatingFileHandler
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from pathlib import Path
+from typing import Optional
+
+# Потік, що пише записи з черги у консоль і файл; запускається в setup_logging
+_listener: Optional[QueueListener] = None
+_file_handler: Optional["BufferedTimedRotatingFileHandler"] = None
+
+LOG_FILE_BUFFER_SIZE = 64 * 1024
+
+# Correlation ID поточного запиту; виставляє CorrelationIdMiddleware,
+# asyncio-задачі, запущені з запиту, успадковують його разом з контекстом
+correlation_id_var: ContextVar[str] = ContextVar("correlation_id", default="-")
+
+# Форматтер для однострочного виводу, спільний для консолі й файлу
+LOG_FORMATTER = logging.Formatter(
+    "%(asctime)s,%(msecs)03d %(levelname)s:%(name)s:[%(correlation_id)s] %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+    defaults={"correlation_id": "-"},
+)
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Додає до запису correlation_id з contextvar.
+
+    Стоїть на QueueHandler, тобто виконується в потоці, що логує: у потоці
+    QueueListener контекст запиту вже недоступний.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id_var.get()
+        return True
+
+
+class BufferedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """TimedRotatingFileHandler з буфером 64 КіБ і без flush після кожного запису.
+
+    Буфер скидається періодично (flush_logs), при ротації/закритті файлу
+    та одразу для записів рівня ERROR і вище.
+    """
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=LOG_FILE_BUFFER_SIZE, encoding=self.encoding, errors=self.errors)
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.ERROR:
+                self.stream.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
 
 
 def setup_logging(log_level: str = "DEBUG") -> logging.Logger:
@@ -24,46 +83,69 @@ def setup_logging(log_level: str = "DEBUG") -> logging.Logger:
         logger.warning(f"Недопустимий рівень логування: {log_level}. Встановлено рівень за замовчуванням: DEBUG")
         log_level = "DEBUG"
 
+    # Повторні виклики (config.py, main.py, воркери) не перевідкривають файл логів
+    root_logger = logging.getLogger()
+    if getattr(root_logger, "_configured", False):
+        return root_logger
+
     # Створюємо директорію для логів
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
 
-    # Форматтер для однострочного виводу
-    log_formatter = logging.Formatter(
-        "%(asctime)s,%(msecs)03d %(levelname)s:%(name)s:%(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-
     # Налаштування обробника для консолі
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(getattr(logging, log_level))
-    console_handler.setFormatter(log_formatter)
+    console_handler.setFormatter(LOG_FORMATTER)
 
     # Налаштування обробника для файлу з ротацією
-    file_handler = TimedRotatingFileHandler(
+    global _file_handler
+    file_handler = BufferedTimedRotatingFileHandler(
         log_dir / "app.log",
         when="midnight",
         interval=1,
         backupCount=7,
         encoding="utf-8",
     )
-    file_handler.setLevel(getattr(logging, log_level))
-    file_handler.setFormatter(log_formatter)
+    file_handler.setFormatter(LOG_FORMATTER)
+    _file_handler = file_handler
 
-    # Налаштування основного логера
-    root_logger = logging.getLogger()
+    # Запис у консоль і файл виконує окремий потік QueueListener: у потоці
+    # event loop лишається тільки постановка запису в чергу
+    global _listener
+    log_queue: queue.Queue = queue.Queue(-1)
+    _listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    # Налаштування основного логера; рівень фільтрується лише тут,
+    # обробники лишаються з NOTSET
     if root_logger.handlers:
         root_logger.handlers.clear()
-    root_logger.addHandler(console_handler)
-    root_logger.addHandler(file_handler)
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(CorrelationIdFilter())
+    root_logger.addHandler(queue_handler)
     root_logger.setLevel(getattr(logging, log_level))
+    root_logger._configured = True
 
     logger.debug(f"Логування налаштовано з рівнем {log_level}. Поточний рівень: {logging.getLevelName(root_logger.level)}")
     return root_logger
 
 
+def flush_logs():
+    """Скидає буфер файлу логів на диск."""
+    if _file_handler is not None:
+        _file_handler.flush()
+
+
+def stop_logging():
+    """Зупиняє QueueListener, дописуючи всі записи, що лишилися в черзі."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
 def update_logging_level(log_level: str):
-    """Оновлює рівень логування для всіх обробників."""
+    """Оновлює рівень логування кореневого логера (обробники мають рівень NOTSET)."""
     valid_log_levels = {"NOTSET", "DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"}
     log_level = log_level.upper()
     logger = logging.getLogger(__name__)
@@ -75,6 +157,35 @@ def update_logging_level(log_level: str):
 
     root_logger = logging.getLogger()
     root_logger.setLevel(getattr(logging, log_level))
-    for handler in root_logger.handlers:
-        handler.setLevel(getattr(logging, log_level))
     logger.info(f"Рівень логування оновлено: {log_level}. Поточний рівень: {logging.getLevelName(root_logger.level)}")
+
+
+class TracebackRateLimiter:
+    """Token bucket для трасувань: у середньому не більше `rate` на секунду, з запасом `burst`."""
+
+    def __init__(self, rate: float = 1.0, burst: int = 10):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+
+_traceback_limiter = TracebackRateLimiter()
+
+
+def traceback_enabled() -> bool:
+    """Чи варто додавати exc_info: на будь-якому рівні логування, але не частіше, ніж дозволяє limiter.
+
+    Форматування трасування дороге, тож під час шторму помилок (наприклад, недоступна БД)
+    трасування отримують лише перші `burst` помилок, а далі - не більше `rate` на секунду.
+    """
+    return _traceback_limiter.allow()
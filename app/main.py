@@ -1,6 +1,7 @@
 # app/main.py
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from .app_initializer import AppInitializer
 from .config import settings
 from .exceptions import global_exception_handler
@@ -19,16 +20,23 @@ from .routers import (
 from .routers.settings import router as settings_router
 from .utils.security import setup_cors
 
-setup_logging(log_level="DEBUG")
+setup_logging(log_level=settings.log_level)
 
-app = FastAPI(title="Inventory Management")
+# ORJSONResponse: JSON-відповіді серіалізуються orjson (C) замість stdlib json.
+# Без openapi_url FastAPI не генерує схему і не реєструє /docs та /redoc.
+app = FastAPI(
+    title="Inventory Management",
+    default_response_class=ORJSONResponse,
+    openapi_url="/openapi.json" if settings.openapi_enabled else None,
+)
+
+# Налаштування CORS (до register_middlewares, щоб IPAllowMiddleware був зовнішнім
+# і preflight-запити з недозволених IP теж отримували 403)
+setup_cors(app, settings)
 
 # Реєстрація middleware
 register_middlewares(app)
 
-# Налаштування CORS
-setup_cors(app, settings)
-
 # Реєстрація обробника винятків
 app.exception_handler(Exception)(global_exception_handler)
 
@@ -46,7 +54,16 @@ app.include_router(sessions.router)
 
 # Ініціалізація додатка
 initializer = AppInitializer(app)
-app.lifespan = initializer.lifespan
+app.router.lifespan_context = initializer.lifespan
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=settings.server_port)
+    # loop="auto" бере uvloop, якщо він встановлений (не доступний на Windows), інакше asyncio.
+    # Access log uvicorn вимкнено: запити й відповіді вже логує RequestLogMiddleware.
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=settings.server_port,
+        loop="auto",
+        http="httptools",
+        access_log=False,
+    )
@@ -1,57 +1,154 @@
 # app/middlewares.py
 import logging
-import uuid
+import re
 
-from fastapi import HTTPException, Request, status
+from fastapi import status
+from fastapi.responses import ORJSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
 
+from .config import HOT_SETTINGS
+from .logging_config import correlation_id_var
+from .utils.ids import new_correlation_id
 from .utils.security import is_ip_allowed
 
 logger = logging.getLogger(__name__)
 
 
-async def add_correlation_id(request: Request, call_next):
-    """Додає унікальний correlation_id для кожного запиту."""
-    correlation_id = str(uuid.uuid4())
-    request.state.logger = logger
-    request.state.correlation_id = correlation_id
-    logger.debug(f"Установлено correlation_id {correlation_id} для запиту")
-    response = await call_next(request)
-    response.headers["X-Correlation-ID"] = correlation_id
-    return response
-
-
-async def log_requests(request: Request, call_next):
-    """Логування вхідних запитів і відповідей."""
-    request_logger = getattr(request.state, "logger", logger)
-    request_logger.info(f"Запит: {request.method} {request.url}, headers: {dict(request.headers)}")
-    response = await call_next(request)
-    request_logger.info(f"Відповідь: {response.status_code}")
-    return response
-
-
-async def check_ip_allowed(request: Request, call_next):
-    """Перевіряє, чи дозволено IP-адресу клієнта."""
-    client_ip = request.client.host
-    request_logger = getattr(request.state, "logger", logger)
-    request_logger.debug(f"Перевірка IP: {client_ip}")
-
-    # Якщо allowed_ip_networks порожній, дозволяємо всі IP
-    if not hasattr(request.app.state, "allowed_ip_networks") or not request.app.state.allowed_ip_networks:
-        request_logger.warning(f"ALLOWED_IPS не ініціалізовано, дозволяємо доступ для IP: {client_ip}")
-        return await call_next(request)
-
-    if not is_ip_allowed(client_ip, request.app.state.allowed_ip_networks):
-        request_logger.warning(f"Доступ заборонено для IP: {client_ip}")
-        raise HTTPException(
+# Службові шляхи (статика, health-check, favicon), які не потребують correlation_id і логування запиту
+_SERVICE_PATH_PREFIXES = ("/static", "/health", "/favicon")
+# Вхідний X-Correlation-ID приймаємо лише у безпечному вигляді, щоб не пустити в логи довільний текст
+_CORRELATION_ID_RE = re.compile(r"[A-Za-z0-9-]{1,64}")
+
+
+def _is_service_request(scope) -> bool:
+    """CORS preflight (OPTIONS) або запит до службового шляху: обробляється без correlation_id і логування."""
+    return scope["method"] == "OPTIONS" or scope["path"].startswith(_SERVICE_PATH_PREFIXES)
+
+
+class CorrelationIdMiddleware:
+    """Чистий ASGI middleware: додає унікальний correlation_id для кожного запиту.
+
+    На відміну від @app.middleware("http") (BaseHTTPMiddleware) не створює Request
+    і окрему задачу на кожен запит.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _is_service_request(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # Correlation ID від клієнта/проксі перевикористовуємо, інакше генеруємо:
+        # 8 випадкових байтів у hex (64 біти достатньо для кореляції логів), без створення об'єкта UUID і форматування з дефісами
+        correlation_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-correlation-id":
+                correlation_id = value.decode("latin-1")
+                break
+        if not correlation_id or not _CORRELATION_ID_RE.fullmatch(correlation_id):
+            correlation_id = new_correlation_id()
+        # request.state читає той самий словник scope["state"]
+        scope.setdefault("state", {})["correlation_id"] = correlation_id
+        # Усі записи логу в межах запиту (і запущені з нього фонові задачі) отримують correlation_id
+        # через CorrelationIdFilter, без LoggerAdapter на кожен запит
+        token = correlation_id_var.set(correlation_id)
+        logger.debug("Установлено correlation_id %s для запиту", correlation_id)
+        header = (b"x-correlation-id", correlation_id.encode("latin-1"))
+
+        async def send_with_correlation_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), header]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_correlation_id)
+        finally:
+            correlation_id_var.reset(token)
+
+
+class RequestLogMiddleware:
+    """Чистий ASGI middleware: логування вхідних запитів і відповідей.
+
+    Статус відповіді береться з повідомлення http.response.start, без BaseHTTPMiddleware
+    з його окремою задачею і потоком повідомлень на кожен запит.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _is_service_request(scope) or not logger.isEnabledFor(logging.INFO):
+            await self.app(scope, receive, send)
+            return
+
+        # Заголовки форматуються лише якщо рівень INFO увімкнено
+        query_string = scope["query_string"].decode("latin-1")
+        logger.info(
+            "Запит: %s %s%s, headers: %s",
+            scope["method"],
+            scope["path"],
+            f"?{query_string}" if query_string else "",
+            {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]},
+        )
+
+        async def send_with_logging(message):
+            if message["type"] == "http.response.start":
+                logger.info("Відповідь: %s", message["status"])
+            await send(message)
+
+        await self.app(scope, receive, send_with_logging)
+
+
+class IPAllowMiddleware:
+    """Чистий ASGI middleware: перевіряє, чи дозволено IP-адресу клієнта."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        client_ip = client[0] if client else ""
+        logger.debug("Перевірка IP: %s", client_ip)
+
+        # Якщо список дозволених IP порожній, дозволяємо всі IP
+        allowed_ips = HOT_SETTINGS["allowed_ips"]
+        if not allowed_ips:
+            logger.warning("ALLOWED_IPS не ініціалізовано, дозволяємо доступ для IP: %s", client_ip)
+            await self.app(scope, receive, send)
+            return
+
+        if is_ip_allowed(client_ip, allowed_ips):
+            await self.app(scope, receive, send)
+            return
+
+        logger.warning("Доступ заборонено для IP: %s", client_ip)
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 1008})
+            return
+        response = ORJSONResponse(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Доступ заборонено: IP не дозволено",
+            content={"detail": "Доступ заборонено: IP не дозволено"},
         )
-    return await call_next(request)
+        await response(scope, receive, send)
 
 
 def register_middlewares(app):
     """Реєструє всі middleware для додатка FastAPI."""
-    app.middleware("http")(add_correlation_id)
-    app.middleware("http")(log_requests)
-    app.middleware("http")(check_ip_allowed)
+    # Кожен наступний middleware стає зовнішнім: порядок виконання -
+    # IPAllowMiddleware -> CorrelationIdMiddleware -> RequestLogMiddleware -> GZipMiddleware -> CORSMiddleware.
+    # Усі middleware - чисті ASGI-класи, без BaseHTTPMiddleware. CORSMiddleware додається
+    # раніше в setup_cors і тому внутрішній: перевірка IP відсікає й preflight-запити,
+    # а CorrelationId/RequestLog пропускають OPTIONS без обробки (_is_service_request).
+    # GZip - найвнутрішній з цих middleware, але зовнішній щодо CORSMiddleware: стискає
+    # відповіді від 1 КіБ (списки /computers, CSV-експорт, зокрема потоковий) разом з CORS-заголовками
+    app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+    app.add_middleware(RequestLogMiddleware)
+    app.add_middleware(CorrelationIdMiddleware)
+    app.add_middleware(IPAllowMiddleware)
     logger.info("Middleware успішно зареєстровано")
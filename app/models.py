@@ -72,7 +72,7 @@ class Computer(Base):
     ad_notes: Mapped[Optional[NonEmptyStr]] = mapped_column(String(1000), default=None)
     local_notes: Mapped[Optional[NonEmptyStr]] = mapped_column(String(1000), default=None)
     last_logon: Mapped[Optional[datetime]] = mapped_column(default=None)
-    check_status: Mapped[Optional[CheckStatus]] = mapped_column(Enum(CheckStatus))
+    check_status: Mapped[Optional[CheckStatus]] = mapped_column(Enum(CheckStatus), index=True)
     is_virtual: Mapped[bool] = mapped_column(default=False)
     is_deleted: Mapped[bool] = mapped_column(Boolean, default=False)
     physical_disks: Mapped[List["PhysicalDisk"]] = relationship(back_populates="computer")
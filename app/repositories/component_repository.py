@@ -1,8 +1,8 @@
 import logging
 from datetime import datetime
-from typing import Any, Callable, Dict, List, Optional, Tuple, Type, TypeVar
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple, Type, TypeVar
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import select
+from sqlalchemy import inspect as sa_inspect, select
 from sqlalchemy.ext.asyncio.session import AsyncSession
 from .. import models
 from ..decorators import log_function_call
@@ -12,6 +12,22 @@ logger = logging.getLogger(__name__)
 
 T = TypeVar("T", bound=models.Base)
 
+# Джерела історії компонентів: (тип, модель, колонка-власник, імена колонок-атрибутів моделі).
+# IP- і MAC-адреси належать Device, тож власника шукаємо за device_id (id комп'ютера = id пристрою).
+_HISTORY_SOURCES = tuple(
+    (component_type, model, owner_column, tuple(attr.key for attr in sa_inspect(model).column_attrs))
+    for component_type, model, owner_column in (
+        ("physical_disk", models.PhysicalDisk, models.PhysicalDisk.computer_id),
+        ("logical_disk", models.LogicalDisk, models.LogicalDisk.computer_id),
+        ("processor", models.Processor, models.Processor.computer_id),
+        ("video_card", models.VideoCard, models.VideoCard.computer_id),
+        ("ip_address", models.IPAddress, models.IPAddress.device_id),
+        ("mac_address", models.MACAddress, models.MACAddress.device_id),
+        ("software", models.InstalledSoftware, models.InstalledSoftware.computer_id),
+    )
+)
+HISTORY_BATCH_SIZE = 500
+
 # Конфігурація компонентів для спрощення оновлення пов’язаних сутностей
 COMPONENT_CONFIG = {
     "ip_addresses": {
@@ -168,7 +184,7 @@ class ComponentRepository:
                             setattr(existing_entity, field, getattr(pydantic_model, field))
 
             await self.db.flush()
-            logger.debug(f"Оновлено {collection_name}", extra={"computer_id": db_computer.id})
+            logger.debug("Оновлено %s", collection_name, extra={"computer_id": db_computer.id})
         except SQLAlchemyError as e:
             logger.error(
                 f"Помилка оновлення {collection_name}: {str(e)}",
@@ -195,45 +211,45 @@ class ComponentRepository:
                     )
             
             await self.db.commit()
-            logger.debug(f"Транзакцію для пов’язаних сутностей зафіксовано", extra={"computer_id": db_computer.id})
+            logger.debug("Транзакцію для пов’язаних сутностей зафіксовано", extra={"computer_id": db_computer.id})
         except SQLAlchemyError as e:
             logger.error(f"Помилка оновлення пов’язаних сутностей для комп’ютера з ID {db_computer.id}: {str(e)}")
             await self.db.rollback()
             raise
 
-    async def get_component_history(self, computer_id: int) -> List[Dict[str, Any]]:
+    async def stream_component_history(self, computer_id: int) -> AsyncGenerator[Dict[str, Any], None]:
+        """Потокова історія компонентів комп'ютера: записи групуються за типом, у межах типу - за detected_on.
+
+        Рядки Core читаються серверним курсором порціями по HISTORY_BATCH_SIZE, без ORM-об'єктів
+        і без накопичення всієї історії в пам'яті.
+        """
+        count = 0
         try:
-            history = []
-            for component_type, model in [
-                ("physical_disk", models.PhysicalDisk),
-                ("logical_disk", models.LogicalDisk),
-                ("processor", models.Processor),
-                ("video_card", models.VideoCard),
-                ("ip_address", models.IPAddress),
-                ("mac_address", models.MACAddress),
-                ("software", models.InstalledSoftware),  # Оновлено з Software на InstalledSoftware
-            ]:
-                result = await self.db.execute(
-                    select(model).where(model.computer_id == computer_id)
+            for component_type, model, owner_column, columns in _HISTORY_SOURCES:
+                query = (
+                    select(*(getattr(model, key) for key in columns))
+                    .where(owner_column == computer_id)
+                    .order_by(model.detected_on)
+                    .execution_options(yield_per=HISTORY_BATCH_SIZE)
                 )
-                for item in result.scalars().all():
-                    history.append(
-                        {
-                            "component_type": component_type,
-                            "data": item.__dict__,
-                            "detected_on": (item.detected_on.isoformat() if item.detected_on else None),
-                            "removed_on": (item.removed_on.isoformat() if item.removed_on else None),
-                        }
-                    )
-            history.sort(key=lambda x: x["detected_on"] or "")
+                result = await self.db.stream(query)
+                async for row in result.mappings():
+                    count += 1
+                    yield {
+                        "component_type": component_type,
+                        "data": dict(row),
+                        "detected_on": row["detected_on"],
+                        "removed_on": row["removed_on"],
+                    }
             logger.debug(
-                f"Отримано історію компонентів: {len(history)} записів",
+                "Отримано історію компонентів: %d записів",
+                count,
                 extra={"computer_id": computer_id},
             )
-            return history
         except SQLAlchemyError as e:
             logger.error(
-                f"Помилка отримання історії компонентів: {str(e)}",
+                "Помилка отримання історії компонентів: %s",
+                e,
                 extra={"computer_id": computer_id},
             )
-            raise
\ No newline at end of file
+            raise
@@ -1,9 +1,10 @@
 import logging
 from datetime import datetime
+from types import MappingProxyType
 from typing import Union, AsyncGenerator, Dict, List, Optional, Tuple, Any
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import selectinload
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, update, and_, func
 from sqlalchemy.ext.asyncio.session import AsyncSession
 from .. import models
 from ..decorators import log_function_call
@@ -11,6 +12,33 @@ from ..schemas import ComputerCreate, ComputerListItem
 
 logger = logging.getLogger(__name__)
 
+# Дозволені значення sort_by -> колонка сортування; перевіряються в роутері до запиту в БД.
+# "os", "last_full_scan" і "check_status" - поля, які надсилає таблиця фронтенду.
+# Незмінне відображення: whitelist не можна розширити під час роботи.
+COMPUTER_SORT_COLUMNS = MappingProxyType(
+    {
+        "hostname": models.Computer.hostname,
+        "last_updated": models.Computer.last_updated,
+        "last_full_scan": models.Computer.last_full_scan,
+        "check_status": models.Computer.check_status,
+        "os_name": models.OperatingSystem.name,
+        "os": models.OperatingSystem.name,
+    }
+)
+
+# Колекції, що потрапляють у CSV-експорт: назва -> (колонка-власник, колонка значення)
+EXPORT_COLLECTIONS = {
+    "ip_addresses": (models.IPAddress.device_id, models.IPAddress.address),
+    "mac_addresses": (models.MACAddress.device_id, models.MACAddress.address),
+    "physical_disks": (models.PhysicalDisk.computer_id, models.PhysicalDisk.model),
+    "processors": (models.Processor.computer_id, models.Processor.name),
+    "video_cards": (models.VideoCard.computer_id, models.VideoCard.name),
+}
+
+# Поля сортування, для яких потрібен JOIN з operating_systems
+OS_SORT_FIELDS = frozenset({"os_name", "os"})
+SORT_ORDERS = frozenset({"asc", "desc"})
+
 class ComputerRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -30,12 +58,31 @@ class ComputerRepository:
             selectinload(models.Computer.domain),
         )
 
+    def _get_list_computer_query(self):
+        """Запит для списку комп'ютерів: лише зв'язки, які є в ComputerListItem."""
+        return select(models.Computer).options(
+            selectinload(models.Computer.ip_addresses),
+            selectinload(models.Computer.mac_addresses),
+            selectinload(models.Computer.os),
+        )
+
+    def _ilike(self, column, pattern: str):
+        """Регістронезалежний LIKE.
+
+        ilike у MySQL рендериться як lower(col) LIKE lower(:p), що вимикає індекс колонки.
+        Колації *_ci у MySQL вже регістронезалежні, тож там достатньо LIKE: точний пошук
+        і пошук за префіксом ідуть по індексу, а '%...%' - скануванням індексу замість таблиці.
+        """
+        if self.db.bind.dialect.name == "mysql":
+            return column.like(pattern)
+        return column.ilike(pattern)
+
     def _apply_computer_filters(
         self,
         query,
         hostname: Optional[str] = None,
         os_name: Optional[str] = None,
-        check_status: Optional[str] = None,
+        check_status: Optional[models.CheckStatus] = None,
         server_filter: Optional[str] = None,
         domain_id: Optional[int] = None,
         ip_range: Optional[str] = None,
@@ -43,19 +90,19 @@ class ComputerRepository:
     ):
         """Централізована логіка застосування фільтрів до запитів."""
         if hostname:
-            query = query.filter(models.Computer.hostname.ilike(f"%{hostname}%"))
+            query = query.filter(self._ilike(models.Computer.hostname, f"%{hostname}%"))
         if os_name:
-            query = query.join(models.OperatingSystem).filter(models.OperatingSystem.name.ilike(f"%{os_name}%"))
+            query = query.join(models.OperatingSystem).filter(self._ilike(models.OperatingSystem.name, f"%{os_name}%"))
         if check_status:
-            query = query.filter(models.Computer.check_status == check_status)
+            query = query.filter(models.Computer.check_status == models.CheckStatus(check_status))
         if server_filter == "server":
-            query = query.join(models.OperatingSystem).filter(models.OperatingSystem.name.ilike("%Server%"))
+            query = query.join(models.OperatingSystem).filter(self._ilike(models.OperatingSystem.name, "%Server%"))
         elif server_filter == "client":
-            query = query.join(models.OperatingSystem).filter(~models.OperatingSystem.name.ilike("%server%"))
+            query = query.join(models.OperatingSystem).filter(~self._ilike(models.OperatingSystem.name, "%server%"))
         if domain_id:
             query = query.filter(models.Computer.domain_id == domain_id)
         if ip_range and ip_range != "none":
-            query = query.join(models.IPAddress).filter(models.IPAddress.address.ilike(f"{ip_range}%"))
+            query = query.join(models.IPAddress).filter(self._ilike(models.IPAddress.address, f"{ip_range}%"))
         if guid_not_null:
             query = query.filter(models.Computer.object_guid.isnot(None))
         return query
@@ -72,7 +119,7 @@ class ComputerRepository:
         self,
         hostname: Optional[str] = None,
         os_name: Optional[str] = None,
-        check_status: Optional[str] = None,
+        check_status: Optional[models.CheckStatus] = None,
         server_filter: Optional[str] = None,
     ):
         """Легкий запит для потокового виведення з мінімальними зв’язками."""
@@ -100,6 +147,7 @@ class ComputerRepository:
         limit: int = 10,
         sort_by: Optional[str] = None,
         sort_order: Optional[str] = None,
+        list_only: bool = False,
     ) -> Union[
         Tuple[List[ComputerListItem], int],
         Tuple[AsyncGenerator[ComputerListItem, None], None],
@@ -107,9 +155,10 @@ class ComputerRepository:
         """
         Базовий метод для отримання комп'ютерів за ідентифікатором, GUID, hostname або фільтрами.
         Повертає список або генератор (якщо stream=True) та загальну кількість (для пагінації).
+        list_only=True завантажує лише зв'язки, потрібні для ComputerListItem.
         """
         try:
-            query = self._get_base_computer_query()
+            query = self._get_list_computer_query() if list_only else self._get_base_computer_query()
 
             # Застосування фільтрів за ідентифікаторами
             if id is not None:
@@ -117,7 +166,7 @@ class ComputerRepository:
             if guid is not None:
                 query = query.filter(models.Computer.object_guid == guid)
             if hostname is not None:
-                query = query.filter(models.Computer.hostname.ilike(hostname.lower()))
+                query = query.filter(self._ilike(models.Computer.hostname, hostname.lower()))
             if domain_id is not None:
                 query = query.filter(models.Computer.domain_id == domain_id)
 
@@ -144,17 +193,12 @@ class ComputerRepository:
 
             # Сортування
             if sort_by:
-                sort_column = None
-                if sort_by == "hostname":
+                sort_column = COMPUTER_SORT_COLUMNS.get(sort_by)
+                if sort_column is None:
+                    logger.warning("Непідтримуваний параметр сортування: %s", sort_by)
                     sort_column = models.Computer.hostname
-                elif sort_by == "last_updated":
-                    sort_column = models.Computer.last_updated
-                elif sort_by == "os_name":
+                elif sort_by in OS_SORT_FIELDS:
                     query = query.join(models.OperatingSystem)
-                    sort_column = models.OperatingSystem.name
-                else:
-                    logger.warning(f"Непідтримуваний параметр сортування: {sort_by}")
-                    sort_column = models.Computer.hostname
 
                 if sort_order and sort_order.lower() == "desc":
                     query = query.order_by(sort_column.desc())
@@ -178,17 +222,23 @@ class ComputerRepository:
 
                 return generator(), None
 
-            # Підрахунок загальної кількості для пагінації
-            count_query = select(func.count()).select_from(query.subquery())
-            total_result = await self.db.execute(count_query)
-            total = total_result.scalar_one()
-
-            # Пагінація
-            query = query.offset((page - 1) * limit).limit(limit)
-
-            # Виконання запиту
-            result = await self.db.execute(query)
-            computers = result.unique().scalars().all()
+            # Сторінка разом із загальною кількістю: COUNT(*) OVER () рахується до LIMIT/OFFSET,
+            # тож окремий запит підрахунку не потрібен
+            paged_query = (
+                query.add_columns(func.count().over().label("total"))
+                .offset((page - 1) * limit)
+                .limit(limit)
+            )
+            rows = (await self.db.execute(paged_query)).unique().all()
+            if rows:
+                total = rows[0].total
+            elif page > 1:
+                # Сторінка за межами вибірки не містить рядків, з яких можна взяти total
+                count_query = select(func.count()).select_from(query.subquery())
+                total = (await self.db.execute(count_query)).scalar_one()
+            else:
+                total = 0
+            computers = [row[0] for row in rows]
 
             # Перетворення в Pydantic-модель
             pydantic_computers = await self._computer_to_pydantic(computers)
@@ -293,7 +343,7 @@ class ComputerRepository:
                     "local_notes",
                 }
             )
-            logger.debug(f"Дані для оновлення: {computer_data}", extra={"hostname": hostname})
+            logger.debug("Дані для оновлення: %s", computer_data, extra={"hostname": hostname})
 
             protected_fields = ["when_created", "when_changed", "enabled", "ad_notes"]
             computer_data = {k: v for k, v in computer_data.items() if k not in protected_fields or v is not None}
@@ -360,7 +410,7 @@ class ComputerRepository:
             if db_computer.check_status != new_check_status:
                 await self.update_computer(db_computer.id, {"check_status": new_check_status})
                 await self.db.commit()
-                logger.debug(f"Статус оновлено до {check_status}", extra={"hostname": hostname})
+                logger.debug("Статус оновлено до %s", check_status, extra={"hostname": hostname})
             return db_computer
         except ValueError:
             logger.error(
@@ -372,10 +422,31 @@ class ComputerRepository:
             logger.error(f"Помилка оновлення статусу: {str(e)}", extra={"hostname": hostname})
             raise
 
+    async def bulk_update_check_status(self, statuses: Dict[str, str]) -> int:
+        """Оновлює check_status за {hostname: статус} одним UPDATE на кожне значення статусу, без commit."""
+        hosts_by_status: Dict[models.CheckStatus, List[str]] = {}
+        for hostname, check_status in statuses.items():
+            hosts_by_status.setdefault(models.CheckStatus(check_status), []).append(hostname)
+        computers = models.Computer.__table__
+        updated = 0
+        try:
+            for check_status, hostnames in hosts_by_status.items():
+                result = await self.db.execute(
+                    update(computers)
+                    .where(computers.c.id.in_(select(models.Device.id).where(models.Device.hostname.in_(hostnames))))
+                    .values(check_status=check_status)
+                )
+                updated += result.rowcount
+            logger.debug("Оновлено check_status для %d комп'ютерів", updated)
+            return updated
+        except SQLAlchemyError as e:
+            logger.error("Помилка пакетного оновлення check_status: %s", e)
+            raise
+
     async def get_computers_list(
         self,
         domain_id: Optional[int] = None,
-        check_status: Optional[str] = None,
+        check_status: Optional[models.CheckStatus] = None,
         os_name: Optional[str] = None,
         ip_range: Optional[str] = None,
         server_filter: Optional[str] = None,
@@ -401,6 +472,7 @@ class ComputerRepository:
                 limit=limit,
                 sort_by=sort_by,
                 sort_order=sort_order,
+                list_only=True,
             )
         except SQLAlchemyError as e:
             logger.error(f"Помилка при отриманні списку комп'ютерів: {str(e)}", exc_info=True)
@@ -442,7 +514,7 @@ class ComputerRepository:
         self,
         hostname: Optional[str] = None,
         os_name: Optional[str] = None,
-        check_status: Optional[str] = None,
+        check_status: Optional[models.CheckStatus] = None,
         server_filter: Optional[str] = None,
     ) -> AsyncGenerator[ComputerListItem, None]:
         """Обгортка: потокове отримання комп'ютерів із фільтрами."""
@@ -459,6 +531,98 @@ class ComputerRepository:
             logger.error(f"Помилка потокового отримання комп’ютерів: {str(e)}")
             raise
 
+    async def stream_computers_for_export(
+        self,
+        hostname: Optional[str] = None,
+        os_name: Optional[str] = None,
+        check_status: Optional[models.CheckStatus] = None,
+        server_filter: Optional[str] = None,
+        sort_by: str = "hostname",
+        sort_order: str = "asc",
+        batch_size: int = 500,
+    ) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """Потокова вибірка комп'ютерів для експорту в CSV порціями по batch_size.
+
+        Повертає рядки Core (без ORM-об'єктів і identity map) як словники, доповнені
+        колекціями EXPORT_COLLECTIONS; колекції читаються одним запитом на порцію.
+        """
+        query = (
+            select(
+                models.Computer.id,
+                models.Computer.hostname,
+                models.Computer.ram,
+                models.Computer.motherboard,
+                models.OperatingSystem.name.label("os_name"),
+                models.Computer.last_updated,
+                models.Computer.check_status,
+            )
+            .select_from(models.Computer)
+            .outerjoin(models.OperatingSystem, models.Computer.os_id == models.OperatingSystem.id)
+        )
+
+        if hostname:
+            query = query.filter(self._ilike(models.Computer.hostname, f"%{hostname}%"))
+        if os_name:
+            query = query.filter(self._ilike(models.OperatingSystem.name, f"%{os_name}%"))
+        if check_status:
+            query = query.filter(models.Computer.check_status == models.CheckStatus(check_status))
+        if server_filter == "server":
+            query = query.filter(self._ilike(models.OperatingSystem.name, "%server%"))
+        elif server_filter == "client":
+            query = query.filter(~self._ilike(models.OperatingSystem.name, "%server%"))
+
+        sort_column = COMPUTER_SORT_COLUMNS.get(sort_by, models.Computer.hostname)
+        query = query.order_by(sort_column.desc() if sort_order == "desc" else sort_column.asc())
+
+        try:
+            result = await self.db.stream(query.execution_options(yield_per=batch_size))
+            # Колекції читаються окремим з'єднанням: поки відкритий серверний курсор,
+            # MySQL не виконує інших запитів на тому ж з'єднанні
+            async with self.db.bind.connect() as related_conn:
+                async for partition in result.mappings().partitions():
+                    ids = [row["id"] for row in partition]
+                    collections = await self._load_export_collections(related_conn, ids)
+                    yield [
+                        {**row, **{name: values.get(row["id"], ()) for name, values in collections.items()}}
+                        for row in partition
+                    ]
+        except SQLAlchemyError as e:
+            logger.error("Помилка потокового експорту комп'ютерів: %s", e)
+            raise
+
+    @staticmethod
+    async def _load_export_collections(conn, ids: List[int]) -> Dict[str, Dict[int, List[str]]]:
+        """Значення колекцій EXPORT_COLLECTIONS для порції комп'ютерів: {назва: {computer_id: [значення]}}."""
+        collections = {}
+        for name, (owner_column, value_column) in EXPORT_COLLECTIONS.items():
+            grouped: Dict[int, List[str]] = {}
+            result = await conn.execute(
+                select(owner_column, value_column).where(owner_column.in_(ids)).order_by(owner_column)
+            )
+            for owner_id, value in result:
+                if value:
+                    grouped.setdefault(owner_id, []).append(value)
+            collections[name] = grouped
+        return collections
+
+    async def get_scan_context(
+        self, hostnames: Optional[List[str]] = None
+    ) -> Dict[str, Tuple[Optional[datetime], Optional[datetime]]]:
+        """Одним запитом повертає {hostname: (last_updated, last_full_scan)}; без hostnames - для всіх хостів."""
+        query = select(
+            models.Computer.hostname,
+            models.Computer.last_updated,
+            models.Computer.last_full_scan,
+        )
+        if hostnames is not None:
+            query = query.where(models.Computer.hostname.in_(hostnames))
+        try:
+            result = await self.db.execute(query)
+            return {hostname: (last_updated, last_full_scan) for hostname, last_updated, last_full_scan in result}
+        except SQLAlchemyError as e:
+            logger.error("Помилка отримання контексту сканування: %s", e)
+            raise
+
     async def get_all_hosts(self) -> List[str]:
         """Обгортка: отримує список усіх hostname."""
         try:
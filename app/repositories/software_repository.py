@@ -1,13 +1,14 @@
 import logging
 import asyncio
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from time import perf_counter
-from aiocache import Cache, cached
+from sqlalchemy import insert
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 from sqlalchemy.orm import selectinload
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from .. import models
 
 logger = logging.getLogger(__name__)
@@ -18,36 +19,74 @@ class SoftwareItem(BaseModel):
     publisher: Optional[str] = None
     install_date: Optional[datetime] = None
 
+# Ключ запису software_catalog: (name, version, publisher)
+SoftwareKey = Tuple[str, str, str]
+
+
+def _collation_key(name: str, version: str, publisher: str) -> SoftwareKey:
+    """
+    Key compared the way the *_ci / PAD SPACE collation of software_catalog does:
+    case-insensitive and ignoring trailing spaces, so "Foo " and "foo" are one catalog row.
+    """
+    return (name.rstrip(" ").lower(), version.rstrip(" ").lower(), publisher.rstrip(" ").lower())
+
+
 class SoftwareRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    @cached(ttl=300, cache=Cache.MEMORY, key_builder=lambda *args, **kwargs: f"software_catalog_{hash(str(kwargs))}")
-    async def _get_software_catalog(self, name: str, version: Optional[str], publisher: Optional[str]) -> Optional[models.SoftwareCatalog]:
-        start_time = perf_counter()
-        try:
+    async def _get_catalog_ids(self, keys: Dict[SoftwareKey, SoftwareKey]) -> Dict[SoftwareKey, int]:
+        """
+        Returns software_catalog ids for collation keys mapped to their reported (name, version, publisher).
+        One SELECT for the whole list; missing entries are created with one multi-row INSERT IGNORE,
+        so a row inserted concurrently by another scan worker is reused instead of failing the update.
+        Keys that still cannot be resolved are logged and left out of the result.
+        """
+        catalog = models.SoftwareCatalog
+
+        async def fetch(names: List[str]) -> Dict[SoftwareKey, int]:
+            # IN порівнює за колацією БД, тож повертає й рядки, що відрізняються регістром
             result = await self.db.execute(
-                select(models.SoftwareCatalog).where(
-                    models.SoftwareCatalog.name == name,
-                    models.SoftwareCatalog.version == (version or "Unknown"),
-                    models.SoftwareCatalog.publisher == (publisher or "Unknown"),
-                )
+                select(catalog.id, catalog.name, catalog.version, catalog.publisher).where(catalog.name.in_(names))
             )
-            catalog_entry = result.scalar_one_or_none()
-            logger.debug(f"Запит до SoftwareCatalog для {name} виконано за {perf_counter() - start_time:.4f}с")
-            return catalog_entry
-        except Exception as e:
-            logger.error(f"Помилка при отриманні запису SoftwareCatalog: {str(e)}")
-            raise
+            found = {_collation_key(name, version, publisher): id_ for id_, name, version, publisher in result.all()}
+            return {key: found[key] for key in keys if key in found}
+
+        catalog_ids = await fetch([raw[0] for raw in keys.values()])
+        missing = [raw for key, raw in keys.items() if key not in catalog_ids]
+        if missing:
+            await self.db.execute(
+                mysql_insert(catalog).prefix_with("IGNORE"),
+                [{"name": name, "version": version, "publisher": publisher} for name, version, publisher in missing],
+            )
+            # MySQL не повертає id рядків multi-row INSERT, тож читаємо їх окремим запитом
+            catalog_ids.update(await fetch([raw[0] for raw in missing]))
+            logger.debug("Нових ключів для software_catalog (INSERT IGNORE): %d", len(missing))
+
+        # Рядки, які колація вважає рівними, але _collation_key ні (напр. акценти в *_ai_ci),
+        # шукаємо точним порівнянням у SQL
+        for key, (name, version, publisher) in keys.items():
+            if key in catalog_ids:
+                continue
+            result = await self.db.execute(
+                select(catalog.id).where(catalog.name == name, catalog.version == version, catalog.publisher == publisher)
+            )
+            catalog_id = result.scalar_one_or_none()
+            if catalog_id is None:
+                # Один незнайдений запис не повинен зривати оновлення ПЗ усього хоста
+                logger.warning("Не знайдено запис software_catalog для %s, пропущено", (name, version, publisher))
+                continue
+            catalog_ids[key] = catalog_id
+        return catalog_ids
 
     async def update_installed_software(self, db_computer: models.Computer, new_software_list: List[SoftwareItem]) -> None:
         """
-        Updates installed software for a computer using the new logic.
-        1. Finds or creates entries in `software_catalog`.
-        2. Synchronizes the `installed_software` linking table.
+        Updates installed software for a computer.
+        1. Finds or creates entries in `software_catalog` in batches.
+        2. Synchronizes the `installed_software` linking table; new links are inserted with one multi-row INSERT.
         """
         start_time = perf_counter()
-        logger.debug(f"Оновлення ПЗ для комп’ютера {db_computer.id}")
+        logger.debug("Оновлення ПЗ для комп’ютера %s", db_computer.id)
         try:
             # Get all current software installations for this computer
             current_installations_result = await self.db.execute(
@@ -57,8 +96,9 @@ class SoftwareRepository:
             )
             current_installations = current_installations_result.scalars().all()
 
+            # Keys follow the catalog collation, so a report differing only in case matches the existing row
             current_software_map = {
-                (
+                _collation_key(
                     inst.software_details.name,
                     inst.software_details.version,
                     inst.software_details.publisher,
@@ -66,77 +106,75 @@ class SoftwareRepository:
                 for inst in current_installations
             }
 
-            incoming_software_keys = set()
-            new_catalog_entries = []
-            new_installations = []
-
-            # Process incoming software list
-            for software_item in new_software_list:
+            # Incoming software keyed by collation key; duplicates in the report are collapsed
+            incoming_software: Dict[SoftwareKey, SoftwareItem] = {}
+            reported_keys: Dict[SoftwareKey, SoftwareKey] = {}
+            for raw_item in new_software_list:
+                # Звіт зі скриптів приходить як список dict
+                try:
+                    software_item = raw_item if isinstance(raw_item, SoftwareItem) else SoftwareItem.model_validate(raw_item)
+                except ValidationError as e:
+                    logger.warning("Пропущено некоректний запис ПЗ %s: %s", raw_item, e)
+                    continue
                 if not software_item.name:
-                    logger.warning(f"Пропущено ПЗ без назви: {software_item}")
+                    logger.warning("Пропущено ПЗ без назви: %s", software_item)
                     continue
-
-                software_key = (
+                reported_key = (
                     software_item.name,
                     software_item.version or "Unknown",
                     software_item.publisher or "Unknown",
                 )
-                incoming_software_keys.add(software_key)
-
-                # Find or create catalog entry
-                catalog_entry = await self._get_software_catalog(
-                    software_item.name,
-                    software_item.version,
-                    software_item.publisher
-                )
-
-                if not catalog_entry:
-                    catalog_entry = models.SoftwareCatalog(
-                        name=software_item.name,
-                        version=software_item.version or "Unknown",
-                        publisher=software_item.publisher or "Unknown",
-                    )
-                    new_catalog_entries.append(catalog_entry)
-
-                # Check if this software is already linked to the computer
-                if software_key in current_software_map:
-                    installation_record = current_software_map[software_key]
-                    if installation_record.removed_on is not None:
-                        installation_record.removed_on = None
-                else:
-                    new_installation = models.InstalledSoftware(
-                        computer_id=db_computer.id,
-                        software_id=catalog_entry.id if catalog_entry.id else None,  # Will be set after flush
-                        install_date=software_item.install_date,
-                        detected_on=datetime.utcnow(),
+                software_key = _collation_key(*reported_key)
+                if software_key not in incoming_software:
+                    incoming_software[software_key] = software_item
+                    reported_keys[software_key] = reported_key
+
+            # Restore software that was marked as removed and appeared again
+            new_keys = set()
+            for software_key in incoming_software:
+                installation_record = current_software_map.get(software_key)
+                if installation_record is None:
+                    new_keys.add(software_key)
+                elif installation_record.removed_on is not None:
+                    installation_record.removed_on = None
+
+            if new_keys:
+                catalog_ids = await self._get_catalog_ids({key: reported_keys[key] for key in new_keys})
+                detected_on = datetime.utcnow()
+                # Різні ключі можуть вказувати на один рядок каталогу - зв'язок з ним вставляємо один раз
+                new_installations = {}
+                for software_key in new_keys:
+                    if software_key not in catalog_ids:
+                        continue
+                    new_installations.setdefault(
+                        catalog_ids[software_key],
+                        {
+                            "computer_id": db_computer.id,
+                            "software_id": catalog_ids[software_key],
+                            "install_date": incoming_software[software_key].install_date,
+                            "detected_on": detected_on,
+                        },
                     )
-                    new_installations.append((new_installation, catalog_entry))
-
-            # Add new catalog entries
-            if new_catalog_entries:
-                self.db.add_all(new_catalog_entries)
-                await self.db.flush()
-
-            # Update software_id for new installations
-            for installation, catalog_entry in new_installations:
-                if not installation.software_id:
-                    installation.software_id = catalog_entry.id
-                self.db.add(installation)
+                if new_installations:
+                    await self.db.execute(insert(models.InstalledSoftware), list(new_installations.values()))
 
             # Mark software that is no longer present as removed
             removed_count = 0
             for key, installation in current_software_map.items():
-                if key not in incoming_software_keys and installation.removed_on is None:
+                if key not in incoming_software and installation.removed_on is None:
                     installation.removed_on = datetime.utcnow()
                     removed_count += 1
 
             await self.db.commit()
             logger.debug(
-                f"Оновлення ПЗ завершено для комп’ютера {db_computer.id}: "
-                f"додано {len(new_installations)} нових, позначено видаленими {removed_count} за {perf_counter() - start_time:.4f}с"
+                "Оновлення ПЗ завершено для комп’ютера %s: додано %d нових, позначено видаленими %d за %.4fс",
+                db_computer.id,
+                len(new_keys),
+                removed_count,
+                perf_counter() - start_time,
             )
 
         except Exception as e:
-            logger.error(f"Помилка оновлення ПЗ для комп’ютера {db_computer.id}: {str(e)}", exc_info=True)
+            logger.error("Помилка оновлення ПЗ для комп’ютера %s: %s", db_computer.id, e, exc_info=True)
             await self.db.rollback()
-            raise
\ No newline at end of file
+            raise
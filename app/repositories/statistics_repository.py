@@ -1,7 +1,6 @@
 import logging
-import asyncio
 from time import perf_counter
-from typing import List, Optional
+from typing import AbstractSet, List, Optional
 from aiocache import Cache, cached
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -220,7 +219,7 @@ class StatisticsRepository:
             logger.error(f"Помилка при отриманні статистики статусів: {str(e)}")
             raise
 
-    async def get_statistics(self, metrics: List[str]) -> schemas.DashboardStats:
+    async def get_statistics(self, metrics: AbstractSet[str]) -> schemas.DashboardStats:
         start_time = perf_counter()
         stats = schemas.DashboardStats(
             total_computers=None,
@@ -233,10 +232,8 @@ class StatisticsRepository:
         async def fetch_total_and_last_scan():
             total_query = select(func.count(models.Computer.id)).filter(models.Computer.is_deleted == False)
             last_scan_query = select(models.ScanTask.updated_at).order_by(models.ScanTask.updated_at.desc())
-            total_result, last_scan_result = await asyncio.gather(
-                self.db.execute(total_query),
-                self.db.execute(last_scan_query)
-            )
+            total_result = await self.db.execute(total_query)
+            last_scan_result = await self.db.execute(last_scan_query)
             stats.total_computers = total_result.scalar_one()
             stats.scan_stats.last_scan_time = last_scan_result.scalars().first()
 
@@ -260,31 +257,35 @@ class StatisticsRepository:
                     schemas.ComponentChangeStats(component_type=component_type, changes_count=count)
                 )
 
+        # Пари (метрика, корутина): результат зіставляється з метрикою за назвою, а не за індексом у metrics
         tasks = []
         if "total_computers" in metrics or "last_scan_time" in metrics:
-            tasks.append(fetch_total_and_last_scan())
+            tasks.append(("total_computers", fetch_total_and_last_scan()))
         if "os_distribution" in metrics:
-            tasks.append(self.get_os_distribution())
+            tasks.append(("os_distribution", self.get_os_distribution()))
         if "software_distribution" in metrics:
-            tasks.append(self.get_software_distribution())
+            tasks.append(("software_distribution", self.get_software_distribution()))
         if "low_disk_space_with_volumes" in metrics:
-            tasks.append(self.get_low_disk_space_with_volumes())
+            tasks.append(("low_disk_space_with_volumes", self.get_low_disk_space_with_volumes()))
         if "status_stats" in metrics:
-            tasks.append(self.get_status_stats())
+            tasks.append(("status_stats", self.get_status_stats()))
         if "component_changes" in metrics:
-            tasks.append(fetch_component_changes())
+            tasks.append(("component_changes", fetch_component_changes()))
 
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                logger.error(f"Помилка при виконанні завдання {metrics[i]}: {str(result)}")
-            elif metrics[i] == "os_distribution":
+        # Запити виконуються послідовно: AsyncSession не допускає паралельних операцій на одному з'єднанні
+        for metric, task in tasks:
+            try:
+                result = await task
+            except Exception as e:
+                logger.error("Помилка при виконанні завдання %s: %s", metric, e)
+                continue
+            if metric == "os_distribution":
                 stats.os_stats = result
-            elif metrics[i] == "software_distribution":
+            elif metric == "software_distribution":
                 stats.os_stats.software_distribution = result
-            elif metrics[i] == "low_disk_space_with_volumes":
+            elif metric == "low_disk_space_with_volumes":
                 stats.disk_stats.low_disk_space = result
-            elif metrics[i] == "status_stats":
+            elif metric == "status_stats":
                 stats.scan_stats.status_stats = result
 
         logger.debug(f"Статистика зібрана за {perf_counter() - start_time:.4f}с")
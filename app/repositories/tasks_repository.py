@@ -1,9 +1,9 @@
 import logging
-import asyncio
 from datetime import datetime
 from typing import List, Optional, Tuple
 from uuid import UUID
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import lambda_stmt, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlmodel import func, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from time import perf_counter
@@ -37,24 +37,26 @@ class TasksRepository:
         start_time = perf_counter()
         validate_task_id(task_id)
         try:
-            existing_task = await self.db.get(models.ScanTask, task_id)
-            if existing_task:
-                logger.warning("Задача сканування вже існує", extra={"task_id": task_id})
-                return existing_task
-
+            # Ідентифікатор щойно згенерований, тож одразу INSERT без попереднього SELECT;
+            # дублікат розпізнається за IntegrityError первинного ключа
+            now = datetime.utcnow()
             new_task = models.ScanTask(
                 id=task_id,
                 status=models.ScanStatus.running,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow(),
+                created_at=now,
+                updated_at=now,
                 scanned_hosts=0,
                 successful_hosts=0,
                 error=None,
             )
             self.db.add(new_task)
             await self.db.commit()
-            logger.debug(f"Нова задача сканування створена за {perf_counter() - start_time:.4f}с", extra={"task_id": task_id})
+            logger.debug("Нова задача сканування створена за %.4fс", perf_counter() - start_time, extra={"task_id": task_id})
             return new_task
+        except IntegrityError:
+            await self.db.rollback()
+            logger.warning("Задача сканування вже існує", extra={"task_id": task_id})
+            return await self.db.get(models.ScanTask, task_id)
         except SQLAlchemyError as e:
             logger.error(f"Помилка створення задачі сканування: {str(e)}", extra={"task_id": task_id})
             await self.db.rollback()
@@ -67,23 +69,30 @@ class TasksRepository:
         scanned_hosts: int,
         successful_hosts: int,
         error: Optional[str] = None,
-    ) -> Optional[models.ScanTask]:
+    ) -> bool:
+        """Оновлює статус задачі одним UPDATE без попереднього читання рядка."""
         start_time = perf_counter()
         validate_task_id(task_id)
         validate_hosts_count(scanned_hosts, successful_hosts)
         try:
-            scan_task = await self.db.get(models.ScanTask, task_id)
-            if not scan_task:
-                logger.warning("Задача сканування не знайдена", extra={"task_id": task_id})
-                return None
-            scan_task.status = status
-            scan_task.scanned_hosts = scanned_hosts
-            scan_task.successful_hosts = successful_hosts
-            scan_task.error = error
-            scan_task.updated_at = datetime.utcnow()
+            result = await self.db.execute(
+                update(models.ScanTask)
+                .where(models.ScanTask.id == task_id)
+                .values(
+                    status=status,
+                    scanned_hosts=scanned_hosts,
+                    successful_hosts=successful_hosts,
+                    # Колонка error - String(255)
+                    error=error[:255] if error else None,
+                    updated_at=datetime.utcnow(),
+                )
+            )
             await self.db.commit()
-            logger.debug(f"Статус задачі оновлено: {status} за {perf_counter() - start_time:.4f}с", extra={"task_id": task_id})
-            return scan_task
+            if not result.rowcount:
+                logger.warning("Задача сканування не знайдена", extra={"task_id": task_id})
+                return False
+            logger.debug("Статус задачі оновлено: %s за %.4fс", status, perf_counter() - start_time, extra={"task_id": task_id})
+            return True
         except SQLAlchemyError as e:
             logger.error(f"Помилка оновлення задачі: {str(e)}", extra={"task_id": task_id})
             await self.db.rollback()
@@ -96,12 +105,14 @@ class TasksRepository:
             logger.error(f"Невалідні параметри пагінації: limit={limit}, offset={offset}")
             raise ValueError("Параметри limit і offset не можуть бути від’ємними")
         try:
-            query = select(models.ScanTask).order_by(models.ScanTask.created_at.desc()).offset(offset).limit(limit)
-            count_query = select(func.count()).select_from(models.ScanTask)
-            result, count_result = await asyncio.gather(
-                self.db.execute(query),
-                self.db.execute(count_query)
-            )
+            # lambda_stmt кешує побудову запиту за кодом лямбди: при повторних викликах
+            # змінюються лише параметри limit/offset, без обходу дерева виразу для cache key
+            query = lambda_stmt(lambda: select(models.ScanTask).order_by(models.ScanTask.created_at.desc()))
+            query += lambda s: s.offset(offset).limit(limit)
+            count_query = lambda_stmt(lambda: select(func.count()).select_from(models.ScanTask))
+            # Запити послідовно: AsyncSession не допускає конкурентних execute
+            result = await self.db.execute(query)
+            count_result = await self.db.execute(count_query)
             tasks = result.scalars().all()
             total = count_result.scalar() or 0
             logger.debug(
@@ -4,7 +4,7 @@ from typing import Callable
 
 from argon2 import PasswordHasher
 from fastapi import APIRouter, Depends, HTTPException, status, Response
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi_users import BaseUserManager, FastAPIUsers
 from fastapi_users.authentication import AuthenticationBackend, CookieTransport
@@ -46,7 +46,7 @@ class AuthenticationBackendWithBody(AuthenticationBackend):
         user_read = UserRead.from_orm(user)
 
         # Створюємо нову JSON-відповідь зі статусом 200 OK
-        final_response = JSONResponse(content=user_read.model_dump())
+        final_response = ORJSONResponse(content=user_read.model_dump())
 
         # Копіюємо заголовки (найголовніше - 'Set-Cookie') з оригінальної відповіді
         final_response.headers.raw.extend(original_response.headers.raw)
@@ -2,13 +2,13 @@ import csv
 import io
 import logging
 import re
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncGenerator, Dict, List, Optional
+import orjson
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse
-from sqlalchemy import select
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 from ..schemas import (
+    CheckStatus,
     ComputerCreate,
     ComputerDetail,
     ComputersResponse,
@@ -16,16 +16,80 @@ from ..schemas import (
     InstalledSoftwareRead,
     LocalNotesUpdate,
 )
-from ..repositories.component_repository import ComponentRepository
+from ..repositories.component_repository import HISTORY_BATCH_SIZE, ComponentRepository
 from ..database import get_db
-from ..models import Computer, OperatingSystem
-from ..repositories.computer_repository import ComputerRepository
-from ..services.computer_service import ComputerService
+from ..dependencies import ServiceContainer, get_services
+from ..repositories.computer_repository import COMPUTER_SORT_COLUMNS, SORT_ORDERS, ComputerRepository
 from .auth import get_current_user
 
 
 logger = logging.getLogger(__name__)
 
+
+# Розмір порції рядків при потоковому експорті CSV
+EXPORT_BATCH_SIZE = 500
+
+
+_CSV_HEADER = (
+    "IP",
+    "Назва",
+    "RAM",
+    "MAC",
+    "Материнська плата",
+    "Ім'я ОС",
+    "Час останньої перевірки",
+    "Тип",
+    "Диск",
+    "Процесор",
+    "Відеокарта",
+    "Статус",
+)
+_CSV_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+_UNWANTED_VIDEO_CARDS = re.compile(r"(?i)microsoft basic display adapter|базовий відеоадаптер \(майкрософт\)|dameware|hyper-v video")
+
+
+def _build_csv_row(computer: Dict[str, Any]) -> tuple:
+    """Рядок CSV з рядка ComputerRepository.stream_computers_for_export."""
+    os_name = computer["os_name"] or "N/A"
+    last_updated = computer["last_updated"]
+    check_status = computer["check_status"]
+    return (
+        ", ".join(computer["ip_addresses"]),
+        computer["hostname"],
+        computer["ram"],
+        ", ".join(computer["mac_addresses"]),
+        computer["motherboard"],
+        os_name,
+        last_updated.strftime(_CSV_DATETIME_FORMAT) if last_updated else "",
+        "Сервер" if "server" in os_name.lower() else "Клієнт",
+        "; ".join(computer["physical_disks"]),
+        ", ".join(computer["processors"]),
+        ", ".join([name for name in computer["video_cards"] if not _UNWANTED_VIDEO_CARDS.search(name)]),
+        check_status.value if check_status else "Невідомо",
+    )
+
+
+def _csv_rows(computers):
+    """Рядки CSV для порції комп'ютерів; рядок з помилкою пропускається."""
+    for computer in computers:
+        try:
+            yield _build_csv_row(computer)
+        except Exception as e:
+            logger.error("Помилка при обробці комп'ютера %s для CSV: %s", computer["hostname"], e)
+
+
+def _validate_sort(sort_by: str, sort_order: str) -> str:
+    """Перевіряє параметри сортування до звернення до БД; повертає нормалізований sort_order."""
+    if sort_by not in COMPUTER_SORT_COLUMNS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Непідтримуване поле сортування: {sort_by}. Допустимі: {', '.join(COMPUTER_SORT_COLUMNS)}",
+        )
+    sort_order = sort_order.lower()
+    if sort_order not in SORT_ORDERS:
+        raise HTTPException(status_code=400, detail="sort_order має бути 'asc' або 'desc'")
+    return sort_order
+
 router = APIRouter(tags=["computers"])
 
 
@@ -38,100 +102,50 @@ async def export_computers_to_csv(
     db: AsyncSession = Depends(get_db),
     hostname: Optional[str] = Query(None, description="Фільтр по hostname"),
     os_name: Optional[str] = Query(None, description="Фільтр по імені ОС"),
-    check_status: Optional[str] = Query(None, description="Фільтр по check_status"),
+    check_status: Optional[CheckStatus] = Query(None, description="Фільтр по check_status"),
     sort_by: str = Query("hostname", description="Поле для сортування"),
     sort_order: str = Query("asc", description="Порядок: asc або desc"),
     server_filter: Optional[str] = Query(None, description="Фільтр для серверних ОС"),
 ):
     """Експорт комп'ютерів у CSV з потоковою передачею даних."""
-    logger.info("Експорт комп'ютерів у CSV", extra=locals())
+    sort_order = _validate_sort(sort_by, sort_order)
+    logger.info(
+        "Експорт комп'ютерів у CSV: hostname=%s, os_name=%s, check_status=%s, server_filter=%s, sort=%s %s",
+        hostname,
+        os_name,
+        check_status,
+        server_filter,
+        sort_by,
+        sort_order,
+    )
 
     async def generate_csv():
         output = io.StringIO()
         writer = csv.writer(output, delimiter=";", lineterminator="\n", quoting=csv.QUOTE_ALL)
         output.write("\ufeff")  # BOM for Excel
 
-        header = [
-            "IP",
-            "Назва",
-            "RAM",
-            "MAC",
-            "Материнська плата",
-            "Ім'я ОС",
-            "Час останньої перевірки",
-            "Тип",
-            "Диск",
-            "Процесор",
-            "Відеокарта",
-            "Статус",
-        ]
-        writer.writerow(header)
+        writer.writerow(_CSV_HEADER)
         yield output.getvalue()
         output.seek(0)
         output.truncate(0)
 
-        unwanted_video_cards_pattern = re.compile(r"(?i)microsoft basic display adapter|базовий відеоадаптер \(майкрософт\)|dameware|hyper-v video")
-
-        # --- Оптимізований запит з JOIN та selectinload для уникнення N+1 проблеми ---
-        query = (
-            select(Computer)
-            .options(
-                selectinload(Computer.ip_addresses),
-                selectinload(Computer.mac_addresses),
-                selectinload(Computer.physical_disks),
-                selectinload(Computer.processors),
-                selectinload(Computer.video_cards),
-                selectinload(Computer.os),
-            )
-            .outerjoin(OperatingSystem, Computer.os_id == OperatingSystem.id)
+        # Серверний курсор порціями по EXPORT_BATCH_SIZE рядків: у пам'яті лише одна порція
+        batches = ComputerRepository(db).stream_computers_for_export(
+            hostname=hostname,
+            os_name=os_name,
+            check_status=check_status,
+            server_filter=server_filter,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            batch_size=EXPORT_BATCH_SIZE,
         )
-
-        # Застосування фільтрів
-        if hostname:
-            query = query.filter(Computer.hostname.ilike(f"%{hostname}%"))
-        if os_name:
-            query = query.filter(OperatingSystem.name.ilike(f"%{os_name}%"))
-        if check_status:
-            query = query.filter(Computer.check_status == check_status)
-        if server_filter == "server":
-            query = query.filter(OperatingSystem.name.ilike("%server%"))
-        elif server_filter == "client":
-            query = query.filter(~OperatingSystem.name.ilike("%server%"))
-
-        # Застосування сортування
-        sort_column = getattr(Computer, sort_by, Computer.hostname)
-        if sort_order.lower() == "desc":
-            query = query.order_by(sort_column.desc())
-        else:
-            query = query.order_by(sort_column.asc())
-
-        stream_result = await db.stream(query)
-        async for computer in stream_result.scalars():
-            try:
-                os_name_str = computer.os.name if computer.os else "N/A"
-                is_server = "Сервер" if "server" in os_name_str.lower() else "Клієнт"
-
-                row_data = [
-                    ", ".join([ip.address for ip in computer.ip_addresses if ip.address]),
-                    computer.hostname,
-                    computer.ram,
-                    ", ".join([mac.address for mac in computer.mac_addresses if mac.address]),
-                    computer.motherboard,
-                    os_name_str,
-                    (computer.last_updated.strftime("%Y-%m-%d %H:%M:%S") if computer.last_updated else ""),
-                    is_server,
-                    "; ".join([disk.model for disk in computer.physical_disks if disk.model]),
-                    ", ".join([proc.name for proc in computer.processors if proc.name]),
-                    ", ".join([vc.name for vc in computer.video_cards if vc.name and not unwanted_video_cards_pattern.search(vc.name)]),
-                    (computer.check_status.value if computer.check_status else "Невідомо"),
-                ]
-                writer.writerow(row_data)
-                yield output.getvalue()
-                output.seek(0)
-                output.truncate(0)
-            except Exception as e:
-                logger.error(f"Помилка при обробці комп'ютера {computer.hostname} для CSV: {e}")
-                continue
+        async for partition in batches:
+            # writerows ітерує в C; помилки окремих рядків обробляє _csv_rows
+            writer.writerows(_csv_rows(partition))
+            # Один chunk відповіді на порцію замість окремого send на кожен рядок
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
         output.close()
 
     headers = {
@@ -149,16 +163,15 @@ async def export_computers_to_csv(
 )
 async def create_computer(
     comp_data: ComputerCreate,
-    db: AsyncSession = Depends(get_db),
+    services: ServiceContainer = Depends(get_services),
 ):
     logger.info("Отримано звіт для hostname", extra={"hostname": comp_data.hostname})
     try:
-        computer_service = ComputerService(db)
-
-        return await computer_service.upsert_computer_from_schema(comp_data, comp_data.hostname)
+        return await services.computer_service.upsert_computer_from_schema(comp_data, comp_data.hostname)
     except Exception as e:
         logger.error(
-            f"Помилка створення/оновлення комп'ютера: {e}",
+            "Помилка створення/оновлення комп'ютера: %s",
+            e,
             extra={"hostname": comp_data.hostname},
             exc_info=True,
         )
@@ -182,15 +195,30 @@ async def update_check_status(
     return {"status": "success"}
 
 
+async def _stream_json_array(first: Dict[str, Any], items) -> AsyncGenerator[bytes, None]:
+    """JSON-масив з асинхронного ітератора: один chunk відповіді на HISTORY_BATCH_SIZE елементів."""
+    chunk = [b"[", orjson.dumps(first)]
+    async for item in items:
+        chunk.append(b",")
+        chunk.append(orjson.dumps(item))
+        if len(chunk) >= 2 * HISTORY_BATCH_SIZE:
+            yield b"".join(chunk)
+            chunk = []
+    chunk.append(b"]")
+    yield b"".join(chunk)
+
+
 @router.get("/{computer_id}/history", response_model=List[Dict[str, Any]])
 async def get_component_history(computer_id: int, db: AsyncSession = Depends(get_db)):
     """Отримує історію компонентів для комп'ютера по ID."""
     logger.info("Запит історії компонентів", extra={"computer_id": computer_id})
-    repo = ComponentRepository(db)  # Використовуємо ComponentRepository
-    history = await repo.get_component_history(computer_id)
-    if not history:
-        raise HTTPException(status_code=404, detail="Історія компонентів не знайдена")
-    return history
+    history = ComponentRepository(db).stream_component_history(computer_id)
+    # Перший запис читаємо до початку відповіді, щоб порожня історія ще могла дати 404
+    try:
+        first = await history.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=404, detail="Історія компонентів не знайдена") from None
+    return StreamingResponse(_stream_json_array(first, history), media_type="application/json")
 
 
 @router.get(
@@ -201,7 +229,7 @@ async def get_component_history(computer_id: int, db: AsyncSession = Depends(get
 async def get_computers(
     hostname: Optional[str] = Query(None, description="Фільтр по hostname"),
     os_name: Optional[str] = Query(None, description="Фільтр по імені ОС"),
-    check_status: Optional[str] = Query(None, description="Фільтр по check_status"),
+    check_status: Optional[CheckStatus] = Query(None, description="Фільтр по check_status"),
     domain: Optional[str] = Query(None, description="Фільтр по імені домену"),
     sort_by: str = Query("hostname", description="Поле для сортування"),
     sort_order: str = Query("asc", description="Порядок: asc або desc"),
@@ -210,6 +238,7 @@ async def get_computers(
     server_filter: Optional[str] = Query(None, description="Фільтр для серверних ОС"),
     db: AsyncSession = Depends(get_db),
 ):
+    sort_order = _validate_sort(sort_by, sort_order)
     repo = ComputerRepository(db)
     computers, total = await repo.get_computers_list(
         page=page,
@@ -221,7 +250,12 @@ async def get_computers(
         check_status=check_status,
         server_filter=server_filter,
     )
-    return ComputersResponse(data=computers, total=total)
+    # Готовий JSON від pydantic-core: FastAPI не повторює валідацію за response_model
+    # і не будує проміжний dict (response_model лишається для OpenAPI-схеми)
+    return Response(
+        content=ComputersResponse(data=computers, total=total).model_dump_json(),
+        media_type="application/json",
+    )
 
 
 @router.get(
@@ -266,7 +300,7 @@ async def get_computer_by_id(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Помилка отримання комп'ютера {computer_id}: {e}", exc_info=True)
+        logger.error("Помилка отримання комп'ютера %s: %s", computer_id, e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Помилка сервера: {e}")
     
 @router.put(
@@ -280,13 +314,13 @@ async def update_local_notes(
     db: AsyncSession = Depends(get_db),
 ):
     """Оновлює локальні примітки для комп'ютера."""
-    logger.info(f"Запит на оновлення локальних приміток для computer_id={computer_id}")
+    logger.info("Запит на оновлення локальних приміток для computer_id=%s", computer_id)
     repo = ComputerRepository(db)
     
     # Спочатку перевіряємо, чи існує комп'ютер
     computers, _ = await repo.get_computer(id=computer_id)
     if not computers:
-        logger.warning(f"Комп'ютер з ID {computer_id} не знайдено")
+        logger.warning("Комп'ютер з ID %s не знайдено", computer_id)
         raise HTTPException(status_code=404, detail="Комп'ютер не знайдено")
     
     db_computer = computers[0]
@@ -295,9 +329,9 @@ async def update_local_notes(
         # Оновлюємо поле
         await repo.update_computer(db_computer.id, {"local_notes": notes_update.local_notes})
         await db.commit()
-        logger.info(f"Локальні примітки для computer_id={computer_id} успішно оновлено")
+        logger.info("Локальні примітки для computer_id=%s успішно оновлено", computer_id)
         return {"status": "success", "message": "Примітки оновлено"}
     except Exception as e:
         await db.rollback()
-        logger.error(f"Помилка оновлення приміток для computer_id={computer_id}: {e}", exc_info=True)
+        logger.error("Помилка оновлення приміток для computer_id=%s: %s", computer_id, e, exc_info=True)
         raise HTTPException(status_code=500, detail="Помилка збереження приміток")
\ No newline at end of file
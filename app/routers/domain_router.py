@@ -9,14 +9,13 @@ from pydantic import ValidationError
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..config import settings
 from ..database import get_db
+from ..dependencies import ServiceContainer, get_services, get_winrm_service
 from ..models import Domain
-from ..repositories.computer_repository import ComputerRepository
 from ..repositories.domain_repository import DomainRepository
 from ..schemas import DomainCreate, DomainRead, DomainUpdate
-from ..services.ad_service import ADService
 from ..services.encryption_service import EncryptionService, get_encryption_service
+from ..services.winrm_service import WinRMService
 from .auth import fastapi_users
 
 logger = logging.getLogger(__name__)
@@ -69,7 +68,12 @@ def validate_domain_name(name: str) -> None:
     response_model=DomainRead,
     dependencies=[Depends(fastapi_users.current_user(active=True, superuser=True))],
 )
-async def create_domain(request: Request, domain: DomainCreate, db: AsyncSession = Depends(get_db)):
+async def create_domain(
+    request: Request,
+    domain: DomainCreate,
+    db: AsyncSession = Depends(get_db),
+    winrm_service: WinRMService = Depends(get_winrm_service),
+):
     """Створює новий домен з зашифрованим паролем."""
     logger.info(f"Валідовані дані домену (без пароля): {domain.model_dump(exclude={'password'})}")
 
@@ -88,7 +92,7 @@ async def create_domain(request: Request, domain: DomainCreate, db: AsyncSession
 
         # Шифруємо пароль
         logger.debug(f"Шифрування пароля для домену: {domain.name}")
-        encryption_service = EncryptionService(settings.encryption_key)
+        encryption_service = get_encryption_service()
         encrypted_password = encryption_service.encrypt(domain.password)
         logger.debug(f"Пароль для домену {domain.name} зашифровано")
 
@@ -102,6 +106,7 @@ async def create_domain(request: Request, domain: DomainCreate, db: AsyncSession
             ad_base_dn=domain.ad_base_dn,
         )
         await db.commit()
+        winrm_service.invalidate_credentials(db_domain.name)
         await db.refresh(db_domain)
         logger.info(f"Домен створено: {db_domain.name} (id={db_domain.id})")
 
@@ -133,6 +138,7 @@ async def update_domain(
     domain: DomainUpdate,
     db: AsyncSession = Depends(get_db),
     encryption_service: EncryptionService = Depends(get_encryption_service),
+    winrm_service: WinRMService = Depends(get_winrm_service),
 ):
     """Оновлює домен за id, зберігаючи пароль, якщо він не наданий."""
     logger.info(f"Початок оновлення домену з id={id}")
@@ -144,6 +150,7 @@ async def update_domain(
         if not db_domain:
             logger.warning(f"Домен з id={id} не знайдено")
             raise HTTPException(status_code=404, detail=f"Домен з id={id} не знайдено")
+        old_name = db_domain.name
 
         # Валідуємо ім’я домену, якщо воно надано
         if domain.name:
@@ -171,6 +178,7 @@ async def update_domain(
         logger.debug(f"Оновлення домену в репозиторії: {db_domain.name}")
         await db.flush()
         await db.commit()
+        winrm_service.invalidate_credentials(old_name, db_domain.name)
         await db.refresh(db_domain)
         logger.info(f"Домен оновлено: {db_domain.name} (id={db_domain.id})")
 
@@ -193,7 +201,11 @@ async def update_domain(
     "/{id}",
     dependencies=[Depends(fastapi_users.current_user(active=True, superuser=True))],
 )
-async def delete_domain(id: int, db: AsyncSession = Depends(get_db)):
+async def delete_domain(
+    id: int,
+    db: AsyncSession = Depends(get_db),
+    winrm_service: WinRMService = Depends(get_winrm_service),
+):
     """Видаляє домен за id."""
     logger.info(f"Початок видалення домену з id={id}")
 
@@ -206,6 +218,7 @@ async def delete_domain(id: int, db: AsyncSession = Depends(get_db)):
 
         await db.delete(domain)
         await db.commit()
+        winrm_service.invalidate_credentials(domain.name)
         logger.info(f"Домен видалено: {domain.name} (id={id})")
 
     except Exception as e:
@@ -307,14 +320,14 @@ async def scan_domains(
         None,
         description="ID домену для сканування. Якщо не вказано, скануються всі домени",
     ),
-    db: AsyncSession = Depends(get_db),
-    encryption_service: EncryptionService = Depends(get_encryption_service),
+    services: ServiceContainer = Depends(get_services),
 ):
     """Запускає сканування AD для конкретного домену (якщо вказано domain_id) або всіх доменів."""
     logger.info(f"Запуск сканування AD, domain_id={domain_id}")
 
     try:
-        ad_service = ADService(ComputerRepository(db), encryption_service)
+        db = services.db
+        ad_service = services.ad_service
 
         if domain_id is not None:
             # Сканування одного домену
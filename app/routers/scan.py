@@ -1,59 +1,66 @@
 import logging
-from uuid import uuid4
+from typing import Optional
 
-from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException, Request
+from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models
-from ..database import get_db
-from ..repositories.computer_repository import ComputerRepository
+from ..database import get_db, get_db_session
+from ..dependencies import ServiceContainer, get_services, get_winrm_service
 from ..schemas import ScanTask
 from ..services.ad_service import ADService
 from ..services.computer_service import ComputerService
+from ..services.encryption_service import get_encryption_service
+from ..services.winrm_service import WinRMService
+from ..utils.background import spawn_background_task
+from ..utils.ids import new_task_id
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["scan"])
 
 
-def get_computer_service(db: AsyncSession = Depends(get_db)) -> ComputerService:
-    return ComputerService(db)
-
-
-def get_ad_service(db: AsyncSession = Depends(get_db)) -> ADService:
-    return ADService(ComputerRepository(db))
-
-
-@router.post("/scan", response_model=dict, operation_id="start_scan")
+@router.post("/scan", response_class=ORJSONResponse, operation_id="start_scan")
 async def start_scan(
-    background_tasks: BackgroundTasks,
-    request: Request,
-    computer_service: ComputerService = Depends(get_computer_service),
+    services: ServiceContainer = Depends(get_services),
+    winrm_service: WinRMService = Depends(get_winrm_service),
     payload: dict = Body(None),
 ):
-    logger_adapter = request.state.logger if request else logger
-    task_id = str(uuid4())
+    computer_service = services.computer_service
+    task_id = new_task_id()
     hostname = payload.get("hostname") if payload else None
-    logger_adapter.info(
-        f"Запуск фонового сканування з ID: {task_id}",
+    logger.info(
+        "Запуск фонового сканування з ID: %s",
+        task_id,
         extra={"hostname": hostname or "всі хости"},
     )
     try:
         task = await computer_service.create_scan_task(task_id)
         if task.status != models.ScanStatus.running:
-            logger_adapter.warning(
-                f"Задача {task_id} вже існує і має статус {task.status}",
+            logger.warning(
+                "Задача %s вже існує і має статус %s",
+                task_id,
+                task.status,
                 extra={"task_id": task_id},
             )
             raise HTTPException(status_code=409, detail=f"Задача з ID {task_id} вже існує")
 
-        background_tasks.add_task(computer_service.run_scan_task, task_id, logger_adapter, hostname=hostname)
+        # Сканування може тривати довго: окрема asyncio-задача з власною сесією БД,
+        # сесія запиту закривається разом з відповіддю
+        spawn_background_task(
+            run_scan_background(task_id, hostname, winrm_service),
+            name=f"scan-{task_id}",
+        )
 
-        return {"status": "success", "task_id": task_id}
+        # Відповідь серіалізується напряму, без валідації response_model і jsonable_encoder
+        return ORJSONResponse({"status": "success", "task_id": task_id})
     except HTTPException:
         raise
     except Exception as e:
-        logger_adapter.error(
-            f"Помилка запуску сканування {task_id}: {str(e)}",
+        logger.error(
+            "Помилка запуску сканування %s: %s",
+            task_id,
+            e,
             extra={"task_id": task_id},
         )
         await computer_service.update_scan_task_status(task_id, models.ScanStatus.failed, error=str(e))
@@ -64,76 +71,94 @@ async def start_scan(
 async def scan_status(
     task_id: str,
     db: AsyncSession = Depends(get_db),
-    request: Request = None,
 ):
-    logger_adapter = request.state.logger if request else logger
     try:
-        async with db as session:
-            from sqlalchemy import select
-
-            result = await session.execute(select(models.ScanTask).filter(models.ScanTask.id == task_id))
-            db_task = result.scalars().first()
-            if not db_task:
-                logger_adapter.error(f"Задача {task_id} не знайдена", extra={"task_id": task_id})
-                raise HTTPException(status_code=404, detail="Задача не знайдена")
-            return db_task
+        # Сесією керує get_db; пошук за первинним ключем: спочатку identity map, без побудови Select
+        db_task = await db.get(models.ScanTask, task_id)
+        if not db_task:
+            logger.error("Задача %s не знайдена", task_id, extra={"task_id": task_id})
+            raise HTTPException(status_code=404, detail="Задача не знайдена")
+        return db_task
+    except HTTPException:
+        raise
     except Exception as e:
-        logger_adapter.error(
-            f"Помилка отримання статусу задачі {task_id}: {str(e)}",
+        logger.error(
+            "Помилка отримання статусу задачі %s: %s",
+            task_id,
+            e,
             extra={"task_id": task_id},
         )
         raise HTTPException(status_code=500, detail="Помилка сервера")
 
 
-@router.post("/ad/scan")
+@router.post("/ad/scan", response_class=ORJSONResponse)
 async def start_ad_scan(
-    background_tasks: BackgroundTasks,
-    service: ComputerService = Depends(get_computer_service),
-    ad_service: ADService = Depends(get_ad_service),
+    services: ServiceContainer = Depends(get_services),
 ):
-    task_id = str(uuid4())
+    service = services.computer_service
+    task_id = new_task_id()
     try:
         logger.info(
-            f"Запуск задачі сканування AD з task_id: {task_id}",
+            "Запуск задачі сканування AD з task_id: %s",
+            task_id,
             extra={"task_id": task_id},
         )
         await service.create_scan_task(task_id)
-        background_tasks.add_task(run_ad_scan_background, task_id, ad_service, service.computer_repo.db)
-        return {"task_id": task_id, "status": "Scan started"}
+        spawn_background_task(run_ad_scan_background(task_id), name=f"ad-scan-{task_id}")
+        return ORJSONResponse({"task_id": task_id, "status": "Scan started"})
     except Exception as e:
         logger.error(
-            f"Помилка при створенні задачі сканування: {str(e)}",
+            "Помилка при створенні задачі сканування: %s",
+            e,
             extra={"task_id": task_id},
         )
         raise HTTPException(status_code=500, detail="Помилка сервера")
 
 
-async def run_ad_scan_background(task_id: str, ad_service: ADService, db: AsyncSession):
+async def run_scan_background(
+    task_id: str,
+    hostname: Optional[str],
+    winrm_service: WinRMService,
+):
+    """Фонова задача сканування хостів з власною сесією БД."""
+    try:
+        async with get_db_session() as db:
+            await ComputerService(db).run_scan_task(task_id, hostname=hostname, winrm_service=winrm_service)
+    except Exception as e:
+        # Статус failed уже записано в run_scan_task; тут лише не даємо винятку загубитись у задачі
+        logger.error("Фонове сканування %s завершилось з помилкою: %s", task_id, e, extra={"task_id": task_id})
+
+
+async def run_ad_scan_background(task_id: str):
     """Фонова задача для сканування AD."""
     logger.info(
-        f"Запуск фонового сканування AD для task_id: {task_id}",
+        "Запуск фонового сканування AD для task_id: %s",
+        task_id,
         extra={"task_id": task_id},
     )
-    try:
-        await ad_service.scan_and_update_ad(db)
-        logger.info(
-            f"Фонове сканування AD завершено для task_id: {task_id}",
-            extra={"task_id": task_id},
-        )
-        computer_service = ComputerService(db)
-        await computer_service.update_scan_task_status(
-            task_id=task_id,
-            status="completed",
-            scanned_hosts=0,  # Можна оновити після доопрацювання ADService
-            successful_hosts=0,  # Можна оновити після доопрацювання ADService
-        )
-    except Exception as e:
-        logger.error(f"Помилка фонового сканування AD: {str(e)}", extra={"task_id": task_id})
+    async with get_db_session() as db:
         computer_service = ComputerService(db)
-        await computer_service.update_scan_task_status(
-            task_id=task_id,
-            status="failed",
-            scanned_hosts=0,
-            successful_hosts=0,
-            error=str(e),
-        )
+        ad_service = ADService(computer_service.computer_repo, get_encryption_service())
+        try:
+            await ad_service.scan_and_update_ad(db)
+            logger.info(
+                "Фонове сканування AD завершено для task_id: %s",
+                task_id,
+                extra={"task_id": task_id},
+            )
+            await computer_service.update_scan_task_status(
+                task_id=task_id,
+                status="completed",
+                scanned_hosts=0,  # Можна оновити після доопрацювання ADService
+                successful_hosts=0,  # Можна оновити після доопрацювання ADService
+            )
+        except Exception as e:
+            logger.error("Помилка фонового сканування AD: %s", e, extra={"task_id": task_id})
+            await db.rollback()
+            await computer_service.update_scan_task_status(
+                task_id=task_id,
+                status="failed",
+                scanned_hosts=0,
+                successful_hosts=0,
+                error=str(e),
+            )
@@ -3,11 +3,9 @@ import json
 import logging
 import os
 from typing import Dict, List
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, ValidationError
-from sqlalchemy.ext.asyncio import AsyncSession
 from ..data_collector import SCRIPTS_DIR, script_cache
-from ..database import get_db_session
 from ..dependencies import get_winrm_service
 from ..services.winrm_service import WinRMService
 from .auth import get_current_user
@@ -47,28 +45,25 @@ async def get_scripts_list():
 async def execute_script(
     script_name: str,
     request_body: ExecuteScriptRequest,
-    db: AsyncSession = Depends(get_db_session),
     winrm_service: WinRMService = Depends(get_winrm_service),
-    request: Request = None,
 ):
-    logger_adapter = request.state.logger if request else logger
     try:
         hostname = request_body.hostname
         params = request_body.params
-        logger_adapter.info(f"Запит на виконання скрипта {script_name} на хості {hostname} з параметрами {params}")
+        logger.info(f"Запит на виконання скрипта {script_name} на хості {hostname} з параметрами {params}")
     except ValidationError as e:
-        logger_adapter.error(f"Помилка валідації тіла запиту: {e.errors()}")
+        logger.error(f"Помилка валідації тіла запиту: {e.errors()}")
         raise HTTPException(status_code=422, detail=e.errors())
 
     scripts_dir = SCRIPTS_DIR
     script_path = os.path.join(scripts_dir, script_name)
 
     if not script_name.endswith(".ps1"):
-        logger_adapter.error(f"Недопустиме розширення файлу: {script_name}")
+        logger.error(f"Недопустиме розширення файлу: {script_name}")
         raise HTTPException(status_code=400, detail="Скрипт повинен мати розширення .ps1")
 
     if not os.path.exists(script_path):
-        logger_adapter.error(f"Скрипт {script_name} не знайдено в папці {os.path.abspath(scripts_dir)}")
+        logger.error(f"Скрипт {script_name} не знайдено в папці {os.path.abspath(scripts_dir)}")
         raise HTTPException(status_code=404, detail="Скрипт не знайдено")
 
     try:
@@ -84,15 +79,15 @@ async def execute_script(
             output = json.loads(result.std_out) if result.std_out else {"Success": False, "Errors": ["No output"]}
             if result.status_code != 0:
                 error_message = result.std_err.decode("utf-8", errors="replace") if result.std_err else "Unknown error"
-                logger_adapter.error(f"Скрипт {script_name} завершився з помилкою: {error_message}")
+                logger.error(f"Скрипт {script_name} завершився з помилкою: {error_message}")
                 output["Errors"] = output.get("Errors", []) + [error_message]
                 output["Success"] = False
             else:
-                logger_adapter.info(f"Скрипт {script_name} успішно виконано на {hostname}")
+                logger.info(f"Скрипт {script_name} успішно виконано на {hostname}")
 
             return output
     except Exception as e:
-        logger_adapter.error(
+        logger.error(
             f"Помилка виконання скрипта {script_name} на {hostname}: {str(e)}",
             exc_info=True,
         )
@@ -18,8 +18,8 @@ get_current_active_user = fastapi_users.current_user(active=True)
 
 @router.get("/", response_model=List[SessionRead])
 async def get_user_sessions(
+    request: Request,
     user: User = Depends(get_current_active_user),
-    request: Request = None,
     db: AsyncSession = Depends(get_db),
 ):
     """Получает список активных сессий (refresh-токенов) для текущего пользователя."""
@@ -66,8 +66,8 @@ async def revoke_session(
 
 @router.post("/revoke-all-others", status_code=status.HTTP_204_NO_CONTENT)
 async def revoke_all_other_sessions(
+    request: Request,
     user: User = Depends(get_current_active_user),
-    request: Request = None,
     db: AsyncSession = Depends(get_db),
 ):
     """Отзывает все сессии пользователя, кроме текущей."""
@@ -1,9 +1,11 @@
+import hashlib
 import logging
+from typing import Optional, Set, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..config import settings
+from ..config import HOT_SETTINGS, settings
 from ..database import get_db
 from ..schemas import AppSettingUpdate
 from .auth import get_current_user
@@ -11,16 +13,45 @@ from .auth import get_current_user
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["settings"])
 
+# Серіалізовані налаштування та їх ETag; перебудовуються лише при зміні HOT_SETTINGS["version"]
+_settings_cache: Optional[Tuple[int, str, bytes]] = None
+
+
+def _settings_payload() -> Tuple[str, bytes]:
+    """Повертає (ETag, JSON) поточних налаштувань, кешовані до наступного оновлення."""
+    global _settings_cache
+    version = HOT_SETTINGS["version"]
+    if _settings_cache is None or _settings_cache[0] != version:
+        body = AppSettingUpdate.model_validate(settings, from_attributes=True).model_dump_json().encode()
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        _settings_cache = (version, etag, body)
+    return _settings_cache[1], _settings_cache[2]
+
+
+def _cache_headers(etag: str) -> dict:
+    # private, no-cache: браузер зберігає відповідь, але завжди перевіряє її через If-None-Match
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def _parse_if_none_match(value: Optional[str]) -> Set[str]:
+    """Розбирає If-None-Match на множину ETag (слабкі W/ порівнюються як сильні)."""
+    if not value:
+        return set()
+    return {tag.strip().removeprefix("W/") for tag in value.split(",")}
+
 
 @router.get(
     "/settings",
     response_model=AppSettingUpdate,
     dependencies=[Depends(get_current_user)],
 )
-async def get_settings():
+async def get_settings(request: Request):
     """Повертає поточні налаштування додатку."""
     logger.info("Отримання поточних налаштувань через API")
-    return settings
+    etag, body = _settings_payload()
+    if etag in _parse_if_none_match(request.headers.get("If-None-Match")):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    return Response(content=body, media_type="application/json", headers=_cache_headers(etag))
 
 
 @router.post(
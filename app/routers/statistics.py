@@ -1,6 +1,8 @@
+import asyncio
 import logging
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from time import monotonic
+from typing import FrozenSet, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.repositories.statistics_repository import StatisticsRepository
@@ -11,6 +13,42 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["statistics"])
 
+# Метрики, які дашборд запитує без параметра metrics
+DEFAULT_STATS_METRICS: FrozenSet[str] = frozenset(
+    {
+        "total_computers",
+        "os_distribution",
+        "low_disk_space_with_volumes",
+        "last_scan_time",
+        "status_stats",
+    }
+)
+# Скільки секунд статистика за замовчуванням віддається з кешу в app.state
+DEFAULT_STATS_TTL = 30.0
+
+
+async def _get_default_statistics(request: Request, db: AsyncSession) -> DashboardStats:
+    """Статистика за DEFAULT_STATS_METRICS з кешем на DEFAULT_STATS_TTL секунд.
+
+    Дашборд опитує /statistics часто й однаково: одночасні запити чекають на lock,
+    і до БД іде лише один з них.
+    """
+    state = request.app.state
+    cached = getattr(state, "default_statistics", None)
+    if cached and cached[0] > monotonic():
+        return cached[1]
+
+    lock = getattr(state, "default_statistics_lock", None)
+    if lock is None:
+        lock = state.default_statistics_lock = asyncio.Lock()
+    async with lock:
+        cached = getattr(state, "default_statistics", None)
+        if cached and cached[0] > monotonic():
+            return cached[1]
+        stats = await StatisticsRepository(db).get_statistics(DEFAULT_STATS_METRICS)
+        state.default_statistics = (monotonic() + DEFAULT_STATS_TTL, stats)
+        return stats
+
 
 @router.get(
     "/statistics",
@@ -19,21 +57,15 @@ router = APIRouter(tags=["statistics"])
     dependencies=[Depends(get_current_user)],
 )
 async def get_statistics(
-    metrics: List[str] = Query(None, description="Список метрик для отримання статистики"),
+    request: Request,
+    metrics: Optional[List[str]] = Query(None, description="Список метрик для отримання статистики"),
     db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"Запит статистики з метриками: {metrics}")
+    logger.info("Запит статистики з метриками: %s", metrics)
     try:
-        repo = StatisticsRepository(db)
         if metrics is None:
-            metrics = [
-                "total_computers",
-                "os_distribution",
-                "low_disk_space_with_volumes",
-                "last_scan_time",
-                "status_stats",
-            ]
-        return await repo.get_statistics(metrics)
+            return await _get_default_statistics(request, db)
+        return await StatisticsRepository(db).get_statistics(frozenset(metrics))
     except Exception as e:
         logger.error(f"Помилка отримання статистики: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Помилка сервера: {str(e)}")
@@ -2,13 +2,16 @@ from app.services.dvr_service import DVRService
 from app.schemas import DahuaDVRCreate
 import logging
 
-async def process_dvr_host(self, host: str, logger_adapter: logging.LoggerAdapter) -> bool:
+logger = logging.getLogger(__name__)
+
+
+async def process_dvr_host(self, host: str) -> bool:
     try:
 
         dvr_service = DVRService(self.db)
         raw_data = await dvr_service.fetch_dvr_data(host)
         if not raw_data:
-            logger_adapter.warning(f"DVR {host} не вдалося отримати дані.")
+            logger.warning("DVR %s не вдалося отримати дані.", host)
             return False
         dvr_data = DahuaDVRCreate(
             hostname=host,
@@ -18,9 +21,9 @@ async def process_dvr_host(self, host: str, logger_adapter: logging.LoggerAdapte
         ).model_dump(exclude_unset=True)
         dvr_id = await self.computer_repo.async_upsert_dvr(dvr=DahuaDVRCreate(**dvr_data), hostname=host)
         await self.db.commit()
-        logger_adapter.info(f"DVR {host} успішно оброблено.")
+        logger.info("DVR %s успішно оброблено.", host)
         return True
     except Exception as e:
-        logger_adapter.error(f"Помилка при обробці DVR {host}: {e}", exc_info=True)
+        logger.error("Помилка при обробці DVR %s: %s", host, e, exc_info=True)
         await self.db.rollback()
         return False
\ No newline at end of file
@@ -2,7 +2,7 @@
 import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional
 from ..schemas import ComputerCreate
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -19,13 +19,13 @@ from ..repositories.software_repository import SoftwareRepository
 from ..repositories.tasks_repository import TasksRepository
 from ..services.encryption_service import get_encryption_service
 from ..services.winrm_service import WinRMService
+from ..utils.background import shutdown_event
 
 logger = logging.getLogger(__name__)
 
 
 class ComputerService:
     def __init__(self, db: AsyncSession):
-        self.semaphore = asyncio.Semaphore(settings.scan_max_workers)
         self.db = db
         self.computer_repo = ComputerRepository(db)
         self.component_repo = ComponentRepository(db)
@@ -48,26 +48,14 @@ class ComputerService:
         """Оновлює статус задачі сканування в базі даних."""
         await self.tasks_repo.update_scan_task_status(task_id, status, scanned_hosts, successful_hosts, error)
 
-    def _determine_scan_mode(self, db_computer: Optional[models.Computer]) -> str:
+    def _determine_scan_mode(self, last_full_scan: Optional[datetime]) -> str:
         """Визначає, чи потрібне повне сканування."""
-        if not db_computer or not db_computer.last_full_scan:
+        if not last_full_scan:
             return "Full"
-        if db_computer.last_full_scan < datetime.utcnow() - timedelta(days=30):
+        if last_full_scan < datetime.utcnow() - timedelta(days=30):
             return "Full"
         return "Changes"
 
-    @log_function_call
-    async def _get_scan_context(self, host: str) -> Tuple[Optional[models.Computer], str]:
-        """Визначає контекст сканування: режим та наявність комп'ютера в БД."""
-        computers, _ = await self.computer_repo.get_computer(hostname=host)
-        db_computer = computers[0] if computers else None
-        mode = self._determine_scan_mode(db_computer)
-        logger.debug(
-            f"Контекст сканування для {host}: режим {mode}",
-            extra={"hostname": host, "mode": mode},
-        )
-        return db_computer, mode
-
     @log_function_call
     async def _fetch_data_from_host(
         self,
@@ -199,31 +187,45 @@ class ComputerService:
             raise
 
     @log_function_call
-    async def process_single_host(self, host: str, winrm_service: WinRMService, logger_adapter: logging.LoggerAdapter) -> bool:
+    async def process_single_host(
+        self,
+        host: str,
+        winrm_service: WinRMService,
+        last_updated: Optional[datetime] = None,
+        last_full_scan: Optional[datetime] = None,
+    ) -> Optional[str]:
+        """
+        Сканує один хост і зберігає зібрані дані.
+        Повертає None при успіху або check_status невдалого сканування; його запис у БД
+        виконує run_scan_task одним UPDATE для всіх хостів.
+        """
         try:
-            db_computer, mode = await self._get_scan_context(host)
-            last_updated = db_computer.last_updated if db_computer else None
+            mode = self._determine_scan_mode(last_full_scan)
+            logger.debug(
+                "Контекст сканування для %s: режим %s",
+                host,
+                mode,
+                extra={"hostname": host, "mode": mode},
+            )
 
             raw_data = await self._fetch_data_from_host(host, mode, last_updated, winrm_service)
 
             if not raw_data or raw_data.get("check_status") in ["failed", "unreachable"]:
-                logger_adapter.warning(
-                    f"Збір даних з хоста {host} не вдався.",
+                raw_data = raw_data or {}
+                logger.warning(
+                    "Збір даних з хоста %s не вдався.",
+                    host,
                     extra={"details": raw_data.get("errors")},
                 )
-                await self.computer_repo.async_update_computer_check_status(host, raw_data.get("check_status", "failed"))
-                await self.computer_repo.db.commit()
-                return False
+                return raw_data.get("check_status", "failed")
 
             await self._prepare_and_save_data(raw_data, host, mode)
-            logger_adapter.info(f"Хост {host} успішно оброблено.")
-            return True
+            logger.info("Хост %s успішно оброблено.", host)
+            return None
         except Exception as e:
-            logger_adapter.error(f"Критична помилка при обробці хоста {host}: {e}", exc_info=True)
-            await self.computer_repo.db.rollback()
-            await self.computer_repo.async_update_computer_check_status(host, "failed")
-            await self.computer_repo.db.commit()
-            return False
+            logger.error("Критична помилка при обробці хоста %s: %s", host, e, exc_info=True)
+            await self.db.rollback()
+            return "failed"
 
     @log_function_call
     async def create_scan_task(self, task_id: str) -> Optional[models.ScanTask]:
@@ -234,7 +236,6 @@ class ComputerService:
     async def run_scan_task(
         self,
         task_id: str,
-        logger_adapter: logging.LoggerAdapter,
         hostname: Optional[str] = None,
         winrm_service: WinRMService = None,
     ):
@@ -256,8 +257,8 @@ class ComputerService:
 
             if hostname:
                 hosts = [hostname]
-                all_hosts = await self.get_hosts_to_scan()
-                if hostname not in all_hosts:
+                scan_context = await self.computer_repo.get_scan_context(hosts)
+                if hostname not in scan_context:
                     await self.update_scan_task_status(
                         task_id=task_id,
                         status=models.ScanStatus.failed,
@@ -267,7 +268,9 @@ class ComputerService:
                     )
                     return
             else:
-                hosts = await self.get_hosts_to_scan()
+                # Хости разом з last_updated і last_full_scan одним запитом, а не SELECT на кожен хост
+                scan_context = await self.computer_repo.get_scan_context()
+                hosts = list(scan_context)
 
             if not hosts:
                 await self.update_scan_task_status(
@@ -278,17 +281,85 @@ class ComputerService:
                 )
                 return
 
-            async def process_host_with_semaphore(host: str):
+            # check_status хостів, сканування яких не вдалося: пишуться в БД одним UPDATE на статус
+            failed_statuses: Dict[str, str] = {}
+
+            async def scan_host(host: str) -> Optional[str]:
+                last_updated, last_full_scan = scan_context.get(host, (None, None))
+                # Окрема сесія на хост: AsyncSession не можна ділити між конкурентними корутинами,
+                # сесія self.db лишається для оновлень ScanTask
+                async with async_session_factory() as host_db:
+                    return await ComputerService(host_db).process_single_host(
+                        host,
+                        winrm_service,
+                        last_updated=last_updated,
+                        last_full_scan=last_full_scan,
+                    )
+
+            async def scan_worker(queue: asyncio.Queue):
                 nonlocal successful
-                async with self.semaphore:
-                    result = await self.process_single_host(host, winrm_service, logger_adapter)
-                    if result:
-                        successful += 1
+                while True:
+                    host = await queue.get()
+                    host_task = stop_task = None
+                    try:
+                        # Після сигналу зупинки решта черги лише вичерпується
+                        if shutdown_event.is_set():
+                            continue
+                        # Хост змагається з сигналом зупинки: завислий WinRM-виклик не тримає shutdown до таймауту
+                        host_task = asyncio.create_task(scan_host(host))
+                        stop_task = asyncio.create_task(shutdown_event.wait())
+                        await asyncio.wait({host_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+                        stop_task.cancel()
+                        if not host_task.done():
+                            host_task.cancel()
+                            await asyncio.gather(host_task, return_exceptions=True)
+                            logger.warning("Сканування хоста %s перервано зупинкою сервера", host)
+                            continue
+                        failed_status = host_task.result()
+                        if failed_status is None:
+                            successful += 1
+                        else:
+                            failed_statuses[host] = failed_status
+                    except asyncio.CancelledError:
+                        for pending in (host_task, stop_task):
+                            if pending is not None:
+                                pending.cancel()
+                        raise
+                    except Exception as e:
+                        logger.error("Помилка обробки хоста %s: %s", host, e)
+                        failed_statuses[host] = "failed"
+                    finally:
+                        queue.task_done()
 
-            await asyncio.gather(
-                *[process_host_with_semaphore(host) for host in hosts],
-                return_exceptions=True,
-            )
+            # Фіксований пул з scan_max_workers воркерів замість корутини на кожен хост.
+            # Значення з БД не проходить валідацію моделі, тож принаймні один воркер гарантуємо тут,
+            # інакше queue.join() чекатиме вічно
+            queue: asyncio.Queue = asyncio.Queue()
+            for host in hosts:
+                queue.put_nowait(host)
+            workers = [
+                asyncio.create_task(scan_worker(queue), name=f"scan-{task_id}-worker-{i}")
+                for i in range(min(max(1, settings.scan_max_workers), len(hosts)))
+            ]
+            try:
+                await queue.join()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+            if failed_statuses:
+                await self.computer_repo.bulk_update_check_status(failed_statuses)
+                await self.db.commit()
+            if shutdown_event.is_set():
+                await self.update_scan_task_status(
+                    task_id=task_id,
+                    status=models.ScanStatus.failed,
+                    scanned_hosts=len(hosts),
+                    successful_hosts=successful,
+                    error="Сканування перервано зупинкою сервера",
+                )
+                return
             await self.update_scan_task_status(
                 task_id=task_id,
                 status=models.ScanStatus.completed,
@@ -1,4 +1,5 @@
 import logging
+from functools import lru_cache
 from typing import Optional
 
 from cryptography.fernet import Fernet, InvalidToken
@@ -25,13 +26,12 @@ class EncryptionService:
         if not encryption_key:
             logger.error("Отсутствует ключ шифрования")
             raise HTTPException(
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Ключ шифрования не предоставлен",
             )
 
         try:
-            # Проверка, что ключ соответствует формату Fernet (32 байта в base64)
-            Fernet(encryption_key.encode())
+            # Fernet проверяет, что ключ соответствует формату (32 байта в base64)
             self.cipher = Fernet(encryption_key.encode())
         except (ValueError, InvalidToken) as e:
             logger.error(f"Неверный формат ключа шифрования: {str(e)}")
@@ -117,6 +117,11 @@ class EncryptionService:
             )
 
 
+@lru_cache(maxsize=1)
+def _encryption_service_for(encryption_key: Optional[str]) -> EncryptionService:
+    return EncryptionService(encryption_key)
+
+
 def get_encryption_service() -> EncryptionService:
-    """Отримує екземпляр EncryptionService з ініціалізованим ключем шифрування."""
-    return EncryptionService(settings.encryption_key)
+    """Отримує спільний екземпляр EncryptionService для поточного ключа шифрування."""
+    return _encryption_service_for(settings.encryption_key)
@@ -3,10 +3,10 @@ import logging
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator, Dict, Tuple
 
-from sqlalchemy.ext.asyncio import AsyncSession
 from winrm import Session
 
 from ..config import settings
+from ..database import async_session_factory
 from ..repositories.domain_repository import DomainRepository
 from ..services.encryption_service import EncryptionService
 
@@ -14,9 +14,8 @@ logger = logging.getLogger(__name__)
 
 
 class WinRMService:
-    def __init__(self, encryption_service: EncryptionService, db: AsyncSession):
+    def __init__(self, encryption_service: EncryptionService):
         self.encryption_service = encryption_service
-        self.domain_repo = DomainRepository(db)
         self._credentials_cache: Dict[str, Tuple[str, str]] = {}
         # Ініціалізація кешу відкладена до асинхронного контексту (startup)
 
@@ -27,7 +26,9 @@ class WinRMService:
     async def _load_credentials(self):
         """Завантажує та дешифрує облікові дані для всіх доменів."""
         try:
-            domains = await self.domain_repo.get_all_domains()
+            # Короткоживуча сесія: сервіс живе весь час роботи додатка і не тримає з'єднання
+            async with async_session_factory() as db:
+                domains = await DomainRepository(db).get_all_domains()
             for domain in domains:
                 try:
                     password = self.encryption_service.decrypt(domain.encrypted_password)
@@ -45,6 +46,12 @@ class WinRMService:
             logger.error(f"Помилка завантаження доменів: {str(e)}", exc_info=True)
             raise
 
+    def invalidate_credentials(self, *domain_names: str):
+        """Видаляє облікові дані доменів з кешу; наступний запит прочитає їх з бази даних."""
+        for domain_name in domain_names:
+            if domain_name and self._credentials_cache.pop(domain_name.lower().strip(), None) is not None:
+                logger.debug(f"Облікові дані для домену {domain_name} видалено з кешу")
+
     async def get_credentials(self, domain_name: str) -> Tuple[str, str]:
         """Отримує облікові дані з кешу або з бази даних, якщо домен відсутній у кеші."""
         domain_name = domain_name.lower()
@@ -52,7 +59,8 @@ class WinRMService:
         if credentials is None:
             logger.warning(f"Домен {domain_name} не знайдено в кеші, виконую запит до бази даних")
             try:
-                domain = await self.domain_repo.get_domain_by_name(domain_name)
+                async with async_session_factory() as db:
+                    domain = await DomainRepository(db).get_domain_by_name(domain_name)
                 if not domain:
                     logger.error(f"Домен {domain_name} не знайдено в базі даних")
                     raise ValueError(f"Домен {domain_name} не знайдено")
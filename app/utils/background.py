@@ -0,0 +1,39 @@
+# app/utils/background.py
+import asyncio
+import logging
+from typing import Coroutine, Set
+
+logger = logging.getLogger(__name__)
+
+# Запущені фонові задачі; посилання тримаємо, щоб event loop не втратив задачу до її завершення
+_BG_TASKS: Set[asyncio.Task] = set()
+# Сигнал зупинки додатка: довгі фонові задачі (сканування) перевіряють його і завершуються самі
+shutdown_event = asyncio.Event()
+
+
+def spawn_background_task(coro: Coroutine, name: str = None) -> asyncio.Task:
+    """Запускає корутину як окрему asyncio-задачу, не прив'язану до життєвого циклу запиту."""
+    task = asyncio.create_task(coro, name=name)
+    _BG_TASKS.add(task)
+    task.add_done_callback(_BG_TASKS.discard)
+    return task
+
+
+def reset_shutdown_event():
+    """Скидає сигнал зупинки на старті lifespan: після попереднього shutdown у тому ж процесі
+    (TestClient, перезапуск додатка) нові сканування інакше зупинялися б одразу."""
+    shutdown_event.clear()
+
+
+async def drain_background_tasks(timeout: float = 30.0):
+    """Подає сигнал зупинки і чекає завершення фонових задач; ті, що не встигли, скасовуються."""
+    shutdown_event.set()
+    if not _BG_TASKS:
+        return
+    logger.info("Очікування завершення %d фонових задач", len(_BG_TASKS))
+    done, pending = await asyncio.wait(set(_BG_TASKS), timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.warning("Скасовано %d фонових задач, що не завершились за %.0f с", len(pending), timeout)
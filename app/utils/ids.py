@@ -0,0 +1,42 @@
+# app/utils/ids.py
+import os
+import uuid
+
+# Кількість ідентифікаторів на одне читання з os.urandom
+_POOL_SIZE = 256
+
+
+class RandomIdPool:
+    """Видає випадкові ідентифікатори з буфера os.urandom: один системний виклик на _POOL_SIZE значень.
+
+    Використовується лише з event loop, тож блокування не потрібне.
+    """
+
+    __slots__ = ("_width", "_buf", "_pos")
+
+    def __init__(self, width: int):
+        self._width = width
+        self._buf = b""
+        self._pos = 0
+
+    def next_bytes(self) -> bytes:
+        if self._pos >= len(self._buf):
+            self._buf = os.urandom(self._width * _POOL_SIZE)
+            self._pos = 0
+        start = self._pos
+        self._pos += self._width
+        return self._buf[start : self._pos]
+
+
+_uuid_pool = RandomIdPool(16)
+_correlation_pool = RandomIdPool(8)
+
+
+def new_task_id() -> str:
+    """UUID4 у звичному рядковому вигляді для ScanTask.id (маршрути /tasks розбирають його як UUID)."""
+    return str(uuid.UUID(bytes=_uuid_pool.next_bytes(), version=4))
+
+
+def new_correlation_id() -> str:
+    """16 hex-символів для заголовка x-correlation-id."""
+    return _correlation_pool.next_bytes().hex()
@@ -1,7 +1,8 @@
 # app/utils/security.py
 import ipaddress
 import logging
-from typing import List, Union
+from bisect import bisect_right
+from typing import Dict, FrozenSet, Iterable, Tuple, Union
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -42,45 +43,103 @@ def validate_allowed_ips(ips_str: str) -> str:
     return ips_str
 
 
-def is_ip_allowed(
-    client_ip: str,
-    allowed_ips: List[
-        Union[
-            ipaddress.IPv4Address,
-            ipaddress.IPv4Network,
-            ipaddress.IPv6Address,
-            ipaddress.IPv6Network,
-        ]
-    ],
-) -> bool:
+class IPAllowList:
+    """Дозволені IP, розібрані один раз при старті.
+
+    Окремі адреси зберігаються як рядки у frozenset (перевірка - один пошук без парсингу).
+    Мережі кожної версії IP зливаються в непересічні діапазони цілих чисел, відсортовані
+    за початком: входження перевіряється bisect за O(log N) замість перебору мереж.
+    """
+
+    __slots__ = ("exact", "networks", "_ranges")
+
+    def __init__(self, entries: Iterable[str] = ()):
+        exact = set()
+        networks = []
+        for entry in entries:
+            parsed = parse_ip_or_network(entry)
+            if isinstance(parsed, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
+                networks.append(parsed)
+            else:
+                exact.add(str(parsed))
+        self.exact: FrozenSet[str] = frozenset(exact)
+        self.networks: Tuple[Union[ipaddress.IPv4Network, ipaddress.IPv6Network], ...] = tuple(networks)
+        # {версія IP: (початки діапазонів, кінці діапазонів)}
+        self._ranges: Dict[int, Tuple[Tuple[int, ...], Tuple[int, ...]]] = {}
+        for version in (4, 6):
+            collapsed = list(ipaddress.collapse_addresses(n for n in networks if n.version == version))
+            if collapsed:
+                self._ranges[version] = (
+                    tuple(int(n.network_address) for n in collapsed),
+                    tuple(int(n.broadcast_address) for n in collapsed),
+                )
+
+    def contains_network_address(self, address: Union[ipaddress.IPv4Address, ipaddress.IPv6Address]) -> bool:
+        """Чи входить адреса в одну з мереж списку."""
+        ranges = self._ranges.get(address.version)
+        if ranges is None:
+            return False
+        starts, ends = ranges
+        value = int(address)
+        index = bisect_right(starts, value) - 1
+        return index >= 0 and value <= ends[index]
+
+    def __bool__(self) -> bool:
+        return bool(self.exact or self.networks)
+
+    def __len__(self) -> int:
+        return len(self.exact) + len(self.networks)
+
+    def __repr__(self) -> str:
+        return f"IPAllowList(exact={sorted(self.exact)}, networks={[str(n) for n in self.networks]})"
+
+
+def build_ip_allowlist(entries: Iterable[str]) -> IPAllowList:
+    """Будує IPAllowList, пропускаючи (з попередженням у лозі) записи з невірним форматом."""
+    valid_entries = []
+    for entry in entries:
+        try:
+            parse_ip_or_network(entry)
+            valid_entries.append(entry)
+        except ValueError as e:
+            logger.warning("Запис ALLOWED_IPS '%s' відхилено, клієнти з нього не матимуть доступу: %s", entry, e)
+    return IPAllowList(valid_entries)
+
+
+def is_ip_allowed(client_ip: str, allowed_ips: IPAllowList) -> bool:
     """
     Перевіряє, чи дозволена IP-адреса клієнта.
     """
+    # Швидкий шлях без парсингу: адреса вже в канонічній формі
+    if client_ip in allowed_ips.exact:
+        return True
     try:
         client_ip_addr = ipaddress.ip_address(client_ip)
-        for ip_or_network in allowed_ips:
-            if isinstance(ip_or_network, (ipaddress.IPv4Network, ipaddress.IPv6Network)) and client_ip_addr in ip_or_network:
-                logger.debug(f"IP {client_ip} дозволено в мережі {ip_or_network}")
-                return True
-            elif client_ip_addr == ip_or_network:
-                logger.debug(f"IP {client_ip} дозволено як окрема адреса")
-                return True
-        logger.warning(f"IP {client_ip} не дозволено")
-        return False
     except ValueError:
-        logger.warning(f"Невірний формат IP-адреси для перевірки: {client_ip}")
+        logger.warning("Невірний формат IP-адреси для перевірки: %s", client_ip)
+        return False
+    # ip_address відрізняється від рядка з exact, якщо клієнт передав ненормалізовану форму
+    # (наприклад, ::0001 замість ::1) - тож exact перевіряємо ще раз і до пропуску мереж
+    if str(client_ip_addr) in allowed_ips.exact:
+        return True
+    if not allowed_ips.networks:
         return False
+    return allowed_ips.contains_network_address(client_ip_addr)
 
 
 def setup_cors(app, settings):
     """
     Налаштовує CORS middleware для додатка FastAPI.
     """
+    # CORSMiddleware перевіряє origin через `origin in allow_origins` на кожному запиті:
+    # frozenset замість списку робить цю перевірку O(1). Рядки заголовків для методів
+    # і заголовків Starlette сам формує один раз у __init__.
+    allow_origins = frozenset(settings.cors_allow_origins_list)
     app.add_middleware(
         CORSMiddleware,
-        allow_origins=settings.cors_allow_origins_list,
+        allow_origins=allow_origins,
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
     )
-    logger.info(f"CORS налаштовано для origins: {settings.cors_allow_origins_list}")
+    logger.info("CORS налаштовано для origins: %s", sorted(allow_origins))
@@ -10,7 +10,7 @@ cd /d C:\Users\semen\inv
 call .venv\Scripts\activate.bat
 
 :: Запустить бекенд
-start "FastAPI Backend" cmd /k "uvicorn app.main:app --reload --host 0.0.0.0 --port 8000"
+start "FastAPI Backend" cmd /k "uvicorn app.main:app --reload --host 0.0.0.0 --port 8000 --http httptools --no-access-log"
 
 :: Перейти в папку фронта
 cd front